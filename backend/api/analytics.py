@@ -0,0 +1,118 @@
+from decimal import Decimal, InvalidOperation
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from . import counters
+from .models import Product, Store
+
+
+def to_object_ids(store_ids):
+    oids = []
+    for sid in store_ids or []:
+        try:
+            oids.append(sid if isinstance(sid, ObjectId) else ObjectId(sid))
+        except (InvalidId, TypeError):
+            continue
+    return oids
+
+
+def store_stats_pipeline(store_oids):
+    """Aggregation pipeline producing per-store product/order/revenue totals."""
+    return [
+        {"$match": {"store": {"$in": store_oids}}},
+        {"$project": {
+            "store": 1,
+            "orders_count": {"$ifNull": ["$orders_count", 0]},
+            # current_price is stored as a string (DecimalField force_string)
+            "price": {"$convert": {"input": "$current_price", "to": "double", "onError": 0, "onNull": 0}},
+        }},
+        {"$group": {
+            "_id": "$store",
+            "products": {"$sum": 1},
+            "orders": {"$sum": "$orders_count"},
+            "revenue": {"$sum": {"$multiply": ["$price", "$orders_count"]}},
+        }},
+    ]
+
+
+def store_stats(store_ids):
+    """Return ``{store_id: {"products", "orders", "revenue"}}`` in one aggregation.
+
+    Stores without products are absent from the result. With sharded
+    counters, increments not folded yet are added (two more queries).
+    """
+    oids = to_object_ids(store_ids)
+    if not oids:
+        return {}
+    stats = {}
+    for row in Product._get_collection().aggregate(store_stats_pipeline(oids)):
+        stats[str(row["_id"])] = {
+            "products": int(row.get("products") or 0),
+            "orders": int(row.get("orders") or 0),
+            "revenue": float(row.get("revenue") or 0),
+        }
+    _add_pending_orders(stats, counters.pending_by_store(oids))
+    return stats
+
+
+def _add_pending_orders(stats, pending):
+    if not pending:
+        return
+    product_ids = [pid for products in pending.values() for pid in products]
+    prices = {
+        doc["_id"]: doc.get("current_price")
+        for doc in Product._get_collection().find({"_id": {"$in": product_ids}}, projection={"current_price": 1})
+    }
+    for store_id, products in pending.items():
+        row = stats.get(str(store_id))
+        if row is None:
+            continue  # products deleted since
+        for pid, count in products.items():
+            if pid not in prices:
+                continue
+            row["orders"] += count
+            row["revenue"] += _price(prices[pid]) * count
+
+
+def _price(value):
+    # Same as the pipeline's $convert to double, onError 0
+    try:
+        return float(Decimal(str(value or 0)))
+    except InvalidOperation:
+        return 0.0
+
+
+def dashboard_summary_for(store_ids):
+    stats = store_stats(store_ids)
+    return {
+        "totalStores": len(store_ids or []),
+        "totalProducts": sum(s["products"] for s in stats.values()),
+        "totalOrders": sum(s["orders"] for s in stats.values()),
+        "totalRevenue": sum(s["revenue"] for s in stats.values()),
+    }
+
+
+def dashboard_breakdown_for(store_ids):
+    oids = to_object_ids(store_ids)
+    if not oids:
+        return []
+    stats = store_stats(oids)
+    stores = {
+        str(s["_id"]): s
+        for s in Store.objects(id__in=oids).only("id", "name", "slug").as_pymongo()
+    }
+    breakdown = []
+    for oid in oids:
+        sdoc = stores.get(str(oid))
+        if not sdoc:
+            continue
+        row = stats.get(str(oid), {})
+        breakdown.append({
+            "id": str(oid),
+            "name": sdoc.get("name"),
+            "slug": sdoc.get("slug"),
+            "products": row.get("products", 0),
+            "orders": row.get("orders", 0),
+        })
+    return breakdown
@@ -0,0 +1,34 @@
+"""Async MongoDB access for the ASGI read endpoints (pymongo's AsyncMongoClient).
+
+The client is created lazily on first use, inside the running event loop,
+and shares connection settings with the MongoEngine read alias.
+"""
+from django.conf import settings
+
+from .db import read_preference
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pymongo < 4.10
+    AsyncMongoClient = None
+
+_client = None
+
+
+def get_async_db():
+    global _client
+    if AsyncMongoClient is None:
+        raise RuntimeError("Async MongoDB access requires pymongo>=4.10 (AsyncMongoClient).")
+    if _client is None:
+        # Only the public reads use it: same preference as the read alias
+        _client = AsyncMongoClient(
+            settings.MONGODB_READ_URI,
+            read_preference=read_preference(settings.MONGODB_PUBLIC_READ_PREFERENCE),
+            **settings.MONGODB_CLIENT_OPTIONS,
+        )
+    return _client[settings.DJANGO_MONGODB_DB]
+
+
+def async_collection(document):
+    """Async collection backing a MongoEngine ``document`` class."""
+    return get_async_db()[document._get_collection_name()]
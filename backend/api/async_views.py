@@ -0,0 +1,88 @@
+"""Async versions of the public storefront read endpoints.
+
+Plain Django async views (DRF's ``@api_view`` is sync-only) reading through
+pymongo's AsyncMongoClient, so a slow Mongo call yields the event loop
+instead of pinning a worker. They return the same JSON as the sync views
+and share the storefront response cache. Serve them with an ASGI server
+(``shopper.asgi:application``) to get the benefit.
+"""
+from bson import ObjectId
+from django.conf import settings
+from django.http import JsonResponse
+
+from .async_db import async_collection
+from .fast_serializers import product_serializer, store_serializer
+from .models import Product, Store, User
+from .pagination import encode_cursor, keyset_filter, page_limit
+from .response_cache import storefront_cache
+
+
+async def health(_request):
+    return JsonResponse({"status": "ok"})
+
+
+async def store_by_slug(request, slug: str):
+    async def build():
+        # Store and owner in one round trip
+        cursor = await async_collection(Store).aggregate([
+            {"$match": {"slug": slug}},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": User._get_collection_name(),
+                "localField": "owner",
+                "foreignField": "_id",
+                "as": "owner_docs",
+            }},
+            {"$project": {**store_serializer.projection, "owner_docs._id": 1, "owner_docs.name": 1,
+                          "owner_docs.email": 1, "owner_docs.phone": 1}},
+        ])
+        docs = await cursor.to_list(length=1)
+        if not docs:
+            return JsonResponse({"detail": "Store not found"}, status=404)
+        doc = docs[0]
+        data = store_serializer.to_representation(doc)
+        owner = (doc.get("owner_docs") or [None])[0]
+        data["owner_info"] = {
+            "id": str(owner["_id"]) if owner else None,
+            "name": owner.get("name") if owner else None,
+            "email": owner.get("email") if owner else None,
+            "phone": owner.get("phone") if owner else None,
+        }
+        return data, {}
+
+    return await storefront_cache.arespond(request, storefront_cache.store_key(slug), build)
+
+
+async def products_by_slug(request, slug: str):
+    store_id = await storefront_cache.cache.aget(storefront_cache.store_id_key(slug))
+    if store_id is None:
+        store = await async_collection(Store).find_one({"slug": slug}, {"_id": 1})
+        if not store:
+            return JsonResponse({"detail": "Store not found"}, status=404)
+        store_id = str(store["_id"])
+        await storefront_cache.cache.aset(storefront_cache.store_id_key(slug), store_id)
+    try:
+        limit = page_limit(request.GET.get("limit"), settings.PRODUCTS_PAGE_SIZE, settings.PRODUCTS_PAGE_SIZE_MAX)
+    except ValueError as e:
+        return JsonResponse({"detail": str(e)}, status=400)
+    cursor = request.GET.get("cursor")
+
+    async def build():
+        query = {"store": ObjectId(store_id)}
+        try:
+            if cursor:
+                query.update(keyset_filter("created_at", cursor))
+        except ValueError as e:
+            return JsonResponse({"detail": str(e)}, status=400)
+        docs = await async_collection(Product).find(
+            query, product_serializer.projection, sort=[("created_at", -1), ("_id", -1)], limit=limit + 1
+        ).to_list(length=limit + 1)
+        headers = {}
+        if len(docs) > limit:
+            docs = docs[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+        return product_serializer.many(docs), headers
+
+    version = await storefront_cache.aproducts_version(store_id)
+    key = storefront_cache.products_key(store_id, version, limit, cursor)
+    return await storefront_cache.arespond(request, key, build)
@@ -0,0 +1,90 @@
+import time
+
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+try:
+    import jwt as pyjwt  # PyJWT expected
+except Exception:
+    pyjwt = None
+
+from .cache import TTLCache
+from .models import User
+
+COOKIE_NAME = "access_token"
+
+# token -> decoded payload, and user id -> User document
+token_cache = TTLCache(
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 300),
+)
+user_cache = TTLCache(
+    maxsize=getattr(settings, "AUTH_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 30),
+)
+
+
+def invalidate_user(user_id):
+    """Drop a cached User so the next request reloads it (call after saving the user)."""
+    user_cache.delete(str(user_id))
+
+
+def decode_token(token):
+    payload = token_cache.get(token)
+    if payload is not None:
+        # Cached payloads were verified already; only expiry can change
+        if payload.get("exp") and payload["exp"] <= time.time():
+            token_cache.delete(token)
+            raise exceptions.AuthenticationFailed("Invalid token: Signature has expired")
+        return payload
+
+    if pyjwt is None or not hasattr(pyjwt, "decode"):
+        raise exceptions.APIException(
+            "JWT library not available. Ensure PyJWT is installed and conflicting 'jwt' package is uninstalled."
+        )
+    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
+    try:
+        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
+    except Exception as e:
+        raise exceptions.AuthenticationFailed(f"Invalid token: {e}")
+
+    ttl = token_cache.ttl
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - time.time())
+    token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def load_user(user_id):
+    user = user_cache.get(str(user_id))
+    if user is not None:
+        return user
+    try:
+        user = User.objects(id=user_id).first()
+    except Exception:
+        user = None
+    if user is not None:
+        user_cache.set(str(user_id), user)
+    return user
+
+
+class CookieJWTAuthentication(BaseAuthentication):
+    """Authenticate from the ``access_token`` cookie issued by ``auth/login``.
+
+    Sets ``request.user`` to the User document and ``request.auth`` to the
+    decoded JWT payload. Requests without the cookie stay anonymous.
+    """
+
+    def authenticate(self, request):
+        token = request.COOKIES.get(COOKIE_NAME)
+        if not token:
+            return None
+        payload = decode_token(token)
+        user = load_user(payload.get("sub"))
+        if not user:
+            raise exceptions.NotFound("User not found")
+        return user, payload
+
+    def authenticate_header(self, request):
+        return 'Cookie realm="api"'
@@ -0,0 +1,101 @@
+"""Multi-item checkout for ``orders/checkout``.
+
+A cart is priced with one ``$in`` read of its products, their
+``orders_count`` counters are bumped with one ``bulk_write`` (limited stock
+is taken first, see ``api/inventory.py``), and one Order per store is recorded with its line items (``record_orders``: one
+``insert_many`` plus the rollup/popularity updates in sync mode).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from bson import ObjectId
+from django.conf import settings
+
+from .inventory import take_stock
+from .models import Order, OrderItem, Product
+from .orders import record_orders
+
+
+def parse_items(items):
+    """Validate a cart payload into ``{product ObjectId: quantity}``; repeated products are merged.
+
+    ``items`` is a list of ``{"product": id, "quantity": n}`` objects or
+    ``[id, n]`` pairs. Raises ``ValueError`` with a message for the client.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list")
+    quantities = defaultdict(int)
+    for item in items:
+        if isinstance(item, dict):
+            pid, qty = item.get("product"), item.get("quantity", 1)
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            pid, qty = item
+        else:
+            raise ValueError("Each item must be {product, quantity} or [product, quantity]")
+        if not isinstance(pid, str) or not ObjectId.is_valid(pid):
+            raise ValueError(f"Invalid product id: {pid!r}")
+        if isinstance(qty, bool) or not isinstance(qty, int) or qty < 1:
+            raise ValueError(f"Quantity must be a positive integer: {qty!r}")
+        quantities[ObjectId(pid)] += qty
+    if len(quantities) > settings.CHECKOUT_MAX_ITEMS:
+        raise ValueError(f"At most {settings.CHECKOUT_MAX_ITEMS} distinct products per checkout")
+    too_many = [str(pid) for pid, qty in quantities.items() if qty > settings.CHECKOUT_MAX_QUANTITY]
+    if too_many:
+        raise ValueError(f"At most {settings.CHECKOUT_MAX_QUANTITY} units per product: {', '.join(too_many)}")
+    return dict(quantities)
+
+
+class ProductsNotFound(LookupError):
+    def __init__(self, ids):
+        super().__init__(ids)
+        self.ids = ids
+
+
+def checkout(quantities):
+    """Record the cart ``{product id: quantity}``; returns the Orders created, one per store.
+
+    Nothing is written when a product does not exist (``ProductsNotFound``)
+    or does not have enough stock left (``SoldOut``).
+    """
+    coll = Product._get_collection()
+    products = {
+        doc["_id"]: doc
+        for doc in coll.find(
+            {"_id": {"$in": list(quantities)}}, projection={"store": 1, "name": 1, "current_price": 1, "stock": 1}
+        )
+    }
+    missing = [str(pid) for pid in quantities if pid not in products]
+    if missing:
+        raise ProductsNotFound(missing)
+
+    take_stock(quantities, products)
+
+    by_store = defaultdict(list)
+    for pid, qty in quantities.items():
+        product = products[pid]
+        by_store[product.get("store")].append(OrderItem(
+            product=pid,
+            name=product.get("name"),
+            quantity=qty,
+            unit_price=Decimal(str(product.get("current_price") or 0)),
+        ))
+    orders = [
+        Order(store=store_id, items=items, total=sum((item.unit_price * item.quantity for item in items), Decimal(0)))
+        for store_id, items in by_store.items()
+    ]
+    return record_orders(orders)
+
+
+def order_payload(order):
+    # From to_mongo(): reading the reference fields would dereference them
+    doc = order.to_mongo()
+    return {
+        "id": str(doc["_id"]) if "_id" in doc else None,
+        "store": str(doc["store"]),
+        "total": doc["total"],
+        "items": [
+            {"product": str(item["product"]), "name": item.get("name"), "quantity": item["quantity"],
+             "unit_price": item["unit_price"]}
+            for item in doc.get("items", [])
+        ],
+    }
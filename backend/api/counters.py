@@ -0,0 +1,143 @@
+"""Sharded ``orders_count`` for products bought faster than one document takes writes.
+
+With ``PRODUCT_COUNTER_SHARDS = N > 0``, purchases of products without a
+stock limit stop incrementing ``Product.orders_count`` directly: each one
+``$inc``s one of N ``ProductCounterShard`` documents picked at random, so
+concurrent buyers of a viral product contend on N documents instead of one.
+(Limited products keep counting on the product: their stock update writes
+that document anyway.)
+
+``counter_folder`` merges the shards back into ``Product.orders_count``
+every ``PRODUCT_COUNTER_FOLD_INTERVAL`` seconds in each process that
+increments them; ``manage.py fold_counters`` does the same once. Until then
+``orders_count`` lags, and the reads that need the exact value add
+``pending()``: ``products/by-slug`` and the dashboards. Ranking (search,
+popularity) uses the folded value.
+"""
+import atexit
+import random
+import threading
+import time
+from collections import defaultdict
+
+from bson import ObjectId
+from django.conf import settings
+from pymongo import ReturnDocument, UpdateOne
+
+from .models import Product, ProductCounterShard
+
+
+def enabled():
+    return getattr(settings, "PRODUCT_COUNTER_SHARDS", 0) > 0
+
+
+def increment_ops(counts):
+    """Upserts adding ``counts`` (``{product id: (store id, quantity)}``) to one random shard each."""
+    shards = settings.PRODUCT_COUNTER_SHARDS
+    return [
+        UpdateOne(
+            {"product": pid, "shard": random.randrange(shards)},
+            {"$inc": {"count": qty}, "$setOnInsert": {"store": store_id}},
+            upsert=True,
+        )
+        for pid, (store_id, qty) in counts.items()
+    ]
+
+
+def increment(counts):
+    if counts:
+        ProductCounterShard._get_collection().bulk_write(increment_ops(counts), ordered=False)
+        counter_folder.ensure_worker()
+
+
+def pending(product_ids):
+    """Increments not folded yet, ``{product ObjectId: count}``."""
+    if not enabled() or not product_ids:
+        return {}
+    rows = ProductCounterShard._get_collection().aggregate([
+        {"$match": {"product": {"$in": list(product_ids)}}},
+        {"$group": {"_id": "$product", "count": {"$sum": "$count"}}},
+    ])
+    return {row["_id"]: row["count"] for row in rows if row["count"]}
+
+
+def pending_by_store(store_ids):
+    """Increments not folded yet per store and product, ``{store: {product: count}}``."""
+    if not enabled() or not store_ids:
+        return {}
+    rows = ProductCounterShard._get_collection().aggregate([
+        {"$match": {"store": {"$in": list(store_ids)}, "count": {"$ne": 0}}},
+        {"$group": {"_id": {"store": "$store", "product": "$product"}, "count": {"$sum": "$count"}}},
+    ])
+    out = defaultdict(dict)
+    for row in rows:
+        out[row["_id"]["store"]][row["_id"]["product"]] = row["count"]
+    return out
+
+
+def add_pending(rows):
+    """Add unfolded increments to serialized products (``id``/``orders_count`` dicts), in place."""
+    counts = pending([ObjectId(row["id"]) for row in rows])
+    for row in rows:
+        extra = counts.get(ObjectId(row["id"]))
+        if extra:
+            row["orders_count"] = (row.get("orders_count") or 0) + extra
+    return rows
+
+
+def fold(log=None):
+    """Move shard counts into ``Product.orders_count``; returns the number of increments folded.
+
+    Each shard is claimed with an atomic swap to 0, so concurrent folders
+    (one per process) never fold the same increments twice. Counts claimed
+    by a folder that dies before its product update are lost.
+    """
+    shards = ProductCounterShard._get_collection()
+    totals = defaultdict(int)
+    for doc in shards.find({"count": {"$gt": 0}}, projection={"_id": 1}):
+        claimed = shards.find_one_and_update(
+            {"_id": doc["_id"], "count": {"$gt": 0}},
+            {"$set": {"count": 0}},
+            projection={"product": 1, "count": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if claimed:
+            totals[claimed["product"]] += claimed["count"]
+    if totals:
+        Product._get_collection().bulk_write(
+            [UpdateOne({"_id": pid}, {"$inc": {"orders_count": count}}) for pid, count in totals.items()],
+            ordered=False,
+        )
+    folded = sum(totals.values())
+    if log:
+        log(len(totals), folded)
+    return folded
+
+
+class CounterFolder:
+    """Runs ``fold()`` every ``interval`` seconds on a daemon thread, started by the first increment."""
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_worker(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="counter-folder", daemon=True)
+                self._thread.start()
+                atexit.register(fold)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                fold()
+            except Exception as e:
+                print("[CounterFolder] Fold error:", e)
+
+
+counter_folder = CounterFolder(interval=getattr(settings, "PRODUCT_COUNTER_FOLD_INTERVAL", 5.0))
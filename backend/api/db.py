@@ -0,0 +1,144 @@
+"""MongoDB client options, read routing and connection pool statistics.
+
+Settings build ``MONGODB_CLIENT_OPTIONS`` from env vars and connect two
+MongoEngine aliases: the default one for writes and authenticated reads,
+and ``MONGODB_READ_ALIAS`` with ``MONGODB_PUBLIC_READ_PREFERENCE`` for
+the public storefront reads (``for_reads``/``read_collection``). Pointing
+that preference at secondaries takes read traffic off the primary at the
+cost of replication lag on public pages; writes always go to the primary.
+
+``pool_stats`` is a pymongo pool listener registered before any client is
+created; it counts checkouts, failures and time spent waiting for a
+connection per server, for ``/api/db/pool-stats`` and ``/api/metrics``.
+"""
+import threading
+
+from django.conf import settings
+from mongoengine.connection import DEFAULT_CONNECTION_NAME, ConnectionFailure, get_connection, get_db
+from pymongo import ReadPreference, monitoring
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primarypreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondarypreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def read_preference(name):
+    try:
+        return READ_PREFERENCES[(name or "primary").replace("_", "").lower()]
+    except KeyError:
+        raise ValueError(f"Unknown read preference {name!r}; use one of {', '.join(READ_PREFERENCES)}")
+
+
+def read_alias():
+    """The read alias if it is connected, else the default one."""
+    alias = getattr(settings, "MONGODB_READ_ALIAS", None)
+    if not alias or alias == DEFAULT_CONNECTION_NAME:
+        return DEFAULT_CONNECTION_NAME
+    try:
+        get_connection(alias)
+    except ConnectionFailure:
+        return DEFAULT_CONNECTION_NAME
+    return alias
+
+
+def for_reads(queryset):
+    """Route a read-only ``queryset`` through the read alias."""
+    alias = read_alias()
+    return queryset if alias == DEFAULT_CONNECTION_NAME else queryset.using(alias)
+
+
+def read_collection(document):
+    """Raw pymongo collection of ``document`` on the read alias."""
+    alias = read_alias()
+    if alias == DEFAULT_CONNECTION_NAME:
+        return document._get_collection()
+    return get_db(alias)[document._get_collection_name()]
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Per-server connection pool counters."""
+
+    FIELDS = ("open", "in_use", "checkouts", "checkout_failures", "wait_seconds", "max_wait_seconds", "cleared")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def _server(self, address):
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        if key not in self._servers:
+            self._servers[key] = dict.fromkeys(self.FIELDS, 0)
+        return self._servers[key]
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._server(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._server(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._server(event.address)["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["checkout_failures"] += 1
+            server["wait_seconds"] += getattr(event, "duration", 0) or 0
+
+    def connection_checked_out(self, event):
+        wait = getattr(event, "duration", 0) or 0  # pymongo >= 4.7
+        with self._lock:
+            server = self._server(event.address)
+            server["checkouts"] += 1
+            server["in_use"] += 1
+            server["wait_seconds"] += wait
+            server["max_wait_seconds"] = max(server["max_wait_seconds"], wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._server(event.address)["in_use"] -= 1
+
+    def stats(self):
+        with self._lock:
+            return {address: dict(values) for address, values in self._servers.items()}
+
+    def render(self):
+        """Prometheus text lines, appended to /api/metrics."""
+        metrics = (
+            ("shopper_mongo_pool_open_connections", "gauge", "open"),
+            ("shopper_mongo_pool_in_use_connections", "gauge", "in_use"),
+            ("shopper_mongo_pool_checkouts_total", "counter", "checkouts"),
+            ("shopper_mongo_pool_checkout_failures_total", "counter", "checkout_failures"),
+            ("shopper_mongo_pool_wait_seconds_total", "counter", "wait_seconds"),
+        )
+        servers = self.stats()
+        lines = []
+        for name, kind, field in metrics:
+            lines.append(f"# TYPE {name} {kind}")
+            lines += [f'{name}{{server="{address}"}} {values[field]}' for address, values in sorted(servers.items())]
+        return "\n".join(lines) + "\n"
+
+
+pool_stats = PoolStats()
@@ -0,0 +1,287 @@
+"""Publish/subscribe of per-store dashboard deltas, streamed by ``dashboard/stream``.
+
+Writes publish small deltas on the channel of the store they touch
+(``store_channel``): orders and revenue from ``record_orders``, product
+counts from ``products/create`` and ``products/import``. ``stores/create``
+publishes on the owner's channel (``user_channel``) so open streams start
+following the new store. The stream sends one snapshot, then only these
+deltas, instead of the dashboards being recomputed on every poll.
+
+``EVENTS_BROKER`` picks the ``Broker``:
+
+- ``LocalBroker`` (default) delivers within the process. With several
+  workers, a stream only sees writes handled by its own worker.
+- ``MongoBroker`` shares events between processes through a capped
+  collection read with a tailable cursor (one per process).
+
+Delivery is best effort: a subscriber that falls behind by more than
+``EVENTS_SUBSCRIBER_QUEUE`` events gets a ``resync`` event instead of
+what it missed, and should reload the snapshot.
+"""
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from mongoengine.connection import get_db
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+RESYNC = {"type": "resync"}
+
+
+def store_channel(store_id):
+    return f"store:{store_id}"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """Events of a set of channels, read with ``get``; ``close`` when done."""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = set(channels)
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+
+    def add(self, channel):
+        self.broker._add(self, channel)
+
+    def get(self, timeout=None):
+        """Next ``(channel, event)``, or ``None`` after ``timeout`` seconds without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _deliver(self, channel, event):
+        with self._lock:
+            try:
+                self._queue.put_nowait((channel, event))
+            except queue.Full:
+                # Replace the backlog with a single resync, the client reloads the snapshot
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._queue.put_nowait((channel, RESYNC))
+
+    def close(self):
+        self.broker._remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Broker:
+    """Interface: ``publish(channel, event)`` and ``subscribe(channels)``.
+
+    Subclasses deliver published events to ``self.dispatch`` in every
+    process that has subscribers; subscription bookkeeping is shared.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> set of Subscription
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        if self.queue_size is None:
+            self.queue_size = settings.EVENTS_SUBSCRIBER_QUEUE
+        subscription = Subscription(self, (), self.queue_size)
+        for channel in channels:
+            self._add(subscription, channel)
+        return subscription
+
+    def dispatch(self, channel, event):
+        """Deliver ``event`` to the subscribers of ``channel``.
+
+        An event with a ``follow`` channel also subscribes them to it, before
+        anything published there afterwards can be missed.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        follow = event.get("follow")
+        for subscription in subscribers:
+            if follow:
+                self._add(subscription, follow)
+            subscription._deliver(channel, event)
+
+    def _add(self, subscription, channel):
+        with self._lock:
+            subscription.channels.add(channel)
+            self._subscribers.setdefault(channel, set()).add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class LocalBroker(Broker):
+    """In-process delivery."""
+
+    def publish(self, channel, event):
+        self.dispatch(channel, event)
+
+
+class MongoBroker(Broker):
+    """Delivery across processes through the ``EVENTS_COLLECTION`` capped collection.
+
+    Each process tails the collection from the time its first subscriber
+    arrives and dispatches events to its own subscribers.
+    """
+
+    def __init__(self, queue_size=None, collection=None, size_bytes=None):
+        super().__init__(queue_size)
+        self.collection = collection
+        self.size_bytes = size_bytes
+        self._coll = None
+        self._thread = None
+
+    def _collection(self):
+        if self._coll is None:
+            name = self.collection or settings.EVENTS_COLLECTION
+            db = get_db()
+            try:
+                self._coll = db.create_collection(name, capped=True, size=self.size_bytes or settings.EVENTS_COLLECTION_SIZE)
+            except CollectionInvalid:  # already there
+                self._coll = db[name]
+        return self._coll
+
+    def publish(self, channel, event):
+        self._collection().insert_one({"channel": channel, "event": event, "at": datetime.utcnow()})
+
+    def subscribe(self, channels):
+        self._ensure_tail()
+        return super().subscribe(channels)
+
+    def _ensure_tail(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._tail, name="events-tail", daemon=True)
+                self._thread.start()
+
+    def _tail(self):
+        coll = self._collection()
+        # Only events published from now on
+        newest = coll.find_one(sort=[("$natural", -1)], projection={"_id": 1})
+        last = newest["_id"] if newest else None
+        while True:
+            query = {"_id": {"$gt": last}} if last is not None else {}
+            try:
+                for doc in coll.find(query, cursor_type=CursorType.TAILABLE_AWAIT):
+                    last = doc["_id"]
+                    self.dispatch(doc["channel"], doc["event"])
+            except Exception as e:
+                print("[MongoBroker] Tail error:", e)
+            time.sleep(0.1)  # empty collection or cursor lost: start again after the last event seen
+
+
+def _load_broker():
+    path = getattr(settings, "EVENTS_BROKER", "api.events.LocalBroker")
+    return import_string(path)()
+
+
+broker = _load_broker()
+
+
+def publish(channel, event):
+    """Publish without failing the write that triggered it."""
+    try:
+        broker.publish(channel, event)
+    except Exception as e:
+        print("[events] Publish error:", e)
+
+
+def publish_orders(orders):
+    """Deltas for Order documents (``to_mongo()`` dicts), one event per store.
+
+    ``orders`` counts units, like the dashboards (sum of ``orders_count``).
+    """
+    deltas = {}
+    for order in orders:
+        store = order.get("store")
+        if store is None:
+            continue
+        orders_count, revenue = deltas.get(store, (0, 0.0))
+        units = sum(item.get("quantity", 1) for item in order.get("items") or []) or 1
+        try:
+            total = float(str(order.get("total") or 0))
+        except ValueError:
+            total = 0.0
+        deltas[store] = (orders_count + units, revenue + total)
+    for store, (orders_count, revenue) in deltas.items():
+        publish(store_channel(store), {"type": "delta", "store": str(store), "orders": orders_count, "revenue": revenue})
+
+
+def publish_products(store_id, count):
+    if count:
+        publish(store_channel(store_id), {"type": "delta", "store": str(store_id), "products": count})
+
+
+def publish_store(user_id, store):
+    publish(user_channel(user_id), {
+        "type": "store", "id": str(store.id), "name": store.name, "slug": store.slug, "follow": store_channel(store.id),
+    })
+
+
+def stream(subscription, store_ids, snapshot):
+    """Server-Sent Events for ``dashboard/stream``: a snapshot, then deltas as they are published.
+
+    ``snapshot(store_ids)`` builds the full dashboard; it is sent again
+    after a ``resync`` instead of the events that were dropped. Comments
+    are sent every ``SSE_HEARTBEAT`` seconds to keep proxies from closing
+    the connection, and the stream ends after ``SSE_MAX_DURATION`` seconds
+    (EventSource reconnects by itself and gets a fresh snapshot).
+    """
+    store_ids = list(store_ids)
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        seq = 0
+        yield sse({"type": "snapshot", **snapshot(store_ids)}, seq)
+        deadline = time.monotonic() + settings.SSE_MAX_DURATION
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = subscription.get(timeout=min(settings.SSE_HEARTBEAT, remaining))
+            if item is None:
+                yield ": ping\n\n"
+                continue
+            _, event = item
+            if event["type"] == "store":
+                store_ids.append(event["id"])  # its channel is followed already, see Broker.dispatch
+            elif event["type"] == "resync":
+                event = {"type": "snapshot", **snapshot(store_ids)}
+            seq += 1
+            yield sse(event, seq)
+    finally:
+        subscription.close()
+
+
+def sse(event, event_id=None):
+    """One Server-Sent Events message."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,63 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from .fast_serializers import order_serializer, product_serializer
+from .models import Order, Product
+
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class _Echo:
+    """File-like object handing csv.writer output straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        # Same "|" separator products/import accepts
+        return "|".join(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _stream(cursor, serializer, fmt, batch_size):
+    """Yield the export in chunks of ``batch_size`` rows, as the cursor delivers them."""
+    writer = csv.writer(_Echo())
+    if fmt == "csv":
+        yield writer.writerow(serializer.fields)
+    chunk = []
+    for doc in cursor:
+        row = serializer.to_representation(doc)
+        if fmt == "csv":
+            chunk.append(writer.writerow([_csv_cell(row[f]) for f in serializer.fields]))
+        else:
+            chunk.append(json.dumps(row, separators=(",", ":")) + "\n")
+        if len(chunk) >= batch_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_response(kind, store_id, fmt, batch_size):
+    """StreamingHttpResponse exporting a store's ``orders`` or ``products``.
+
+    Reads through a server-side cursor fetching ``batch_size`` documents per
+    round trip, projected to the exported fields, so memory stays flat and
+    the first bytes go out as soon as the first batch arrives.
+    """
+    if kind == "orders":
+        document, serializer, sort = Order, order_serializer, [("created_at", 1), ("_id", 1)]
+    else:
+        document, serializer, sort = Product, product_serializer, [("created_at", -1), ("_id", -1)]
+    cursor = document._get_collection().find(
+        {"store": store_id}, serializer.projection, sort=sort, batch_size=batch_size
+    )
+    resp = StreamingHttpResponse(_stream(cursor, serializer, fmt, batch_size), content_type=CONTENT_TYPES[fmt])
+    resp["Content-Disposition"] = f'attachment; filename="{kind}-{store_id}.{fmt}"'
+    return resp
@@ -0,0 +1,106 @@
+"""Map raw MongoDB documents to the JSON shape of the DRF serializers.
+
+``DocumentSerializer`` needs hydrated MongoEngine documents and walks DRF
+field objects for every row. The serializers here work on plain dicts
+(``as_pymongo()`` or a driver cursor) with one converter per field,
+compiled once from the document's field definitions.
+"""
+from datetime import timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from bson import ObjectId
+from mongoengine import fields as me
+
+from .serializers import OrderSerializer, ProductSerializer, ProjectSerializer, StoreSerializer
+
+
+def _object_id(value):
+    if value is None:
+        return None
+    if isinstance(value, ObjectId):
+        return str(value)
+    # DBRef or a dereferenced document
+    return str(getattr(value, "id", value))
+
+
+def _datetime(value):
+    if not value:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    out = value.astimezone(dt_timezone.utc).isoformat()
+    return out[:-6] + "Z" if out.endswith("+00:00") else out
+
+
+def _decimal(places):
+    quantum = Decimal(1).scaleb(-places)
+
+    def convert(value):
+        if value is None or value == "":
+            return None
+        try:
+            return str(Decimal(str(value)).quantize(quantum))
+        except InvalidOperation:
+            return str(value)
+
+    return convert
+
+
+def _identity(value):
+    return value
+
+
+def _converter(field):
+    if isinstance(field, (me.ObjectIdField, me.ReferenceField, me.LazyReferenceField)):
+        return _object_id
+    if isinstance(field, me.DateTimeField):
+        return _datetime
+    if isinstance(field, me.DecimalField):
+        return _decimal(field.precision)
+    return _identity
+
+
+def _default(field):
+    default = field.default
+    if callable(default):
+        return default
+    return lambda: default
+
+
+class RawSerializer:
+    """Serialize raw documents of ``document`` to ``fields``, like a DocumentSerializer would."""
+
+    def __init__(self, document, fields):
+        self.document = document
+        self.fields = tuple(fields)
+        self.db_fields = {}
+        self._plan = []
+        for name in self.fields:
+            field = document._fields[name]
+            db_name = "_id" if name == "id" else field.db_field
+            self.db_fields[name] = db_name
+            self._plan.append((name, db_name, _converter(field), _default(field)))
+
+    @property
+    def projection(self):
+        return {db_name: 1 for db_name in self.db_fields.values()}
+
+    def to_representation(self, doc):
+        out = {}
+        for name, db_name, convert, default in self._plan:
+            value = doc.get(db_name)
+            if value is None:
+                # Missing fields get the model default, as a hydrated document would
+                value = default()
+            out[name] = convert(value) if value is not None else None
+        return out
+
+    def many(self, docs):
+        to_representation = self.to_representation
+        return [to_representation(doc) for doc in docs]
+
+
+project_serializer = RawSerializer(ProjectSerializer.Meta.model, ProjectSerializer.Meta.fields)
+store_serializer = RawSerializer(StoreSerializer.Meta.model, StoreSerializer.Meta.fields)
+product_serializer = RawSerializer(ProductSerializer.Meta.model, ProductSerializer.Meta.fields)
+order_serializer = RawSerializer(OrderSerializer.Meta.model, OrderSerializer.Meta.fields)
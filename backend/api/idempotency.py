@@ -0,0 +1,125 @@
+"""``Idempotency-Key`` support for retried writes.
+
+A view wrapped with ``idempotent(scope)`` runs once per key: the first
+request claims the key with an insert into ``IdempotencyRecord`` (unique
+``_id``), runs, and stores its rendered response; retries with the same
+key get that response back with ``Idempotent-Replayed: true`` and never
+reach the view. Finished records are also kept in an in-process TTLCache,
+so a burst of retries on one worker costs no database round trip. Records
+expire through a TTL index on ``created_at``.
+
+A retry arriving while the first request is still running gets 409, the
+same key with a different body gets 422, and a 5xx outcome releases the
+key so the client can retry for real; so do 401/403/408/409/429.
+"""
+import functools
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from pymongo.errors import DuplicateKeyError
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .cache import TTLCache
+from .models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Outcomes a retry of the same request may change: the key is released instead of stored
+RETRYABLE_STATUSES = {401, 403, 408, 409, 429}
+
+# scoped key -> (fingerprint, status code, rendered body)
+replay_cache = TTLCache(
+    maxsize=getattr(settings, "IDEMPOTENCY_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "IDEMPOTENCY_CACHE_TTL", 300),
+)
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    if request.content_type.startswith("multipart/"):
+        # Uploads can be larger than DATA_UPLOAD_MAX_MEMORY_SIZE allows .body to read
+        for name, values in sorted(request.POST.lists()):
+            digest.update(json.dumps([name, values]).encode())
+        for name, files in sorted(request.FILES.lists()):
+            digest.update(json.dumps([name, [(f.name, f.size) for f in files]]).encode())
+    else:
+        digest.update(request._request.body)
+    return digest.hexdigest()
+
+
+def _mismatch():
+    return Response(
+        {"detail": f"{HEADER} was already used with a different request"},
+        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def _replay(fingerprint, stored):
+    expected, status_code, body = stored
+    if expected != fingerprint:
+        return _mismatch()
+    return Response(json.loads(body), status=status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(scope):
+    """Make a DRF function view replay its first response for a repeated ``Idempotency-Key``."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response({"detail": f"{HEADER} is too long"}, status=status.HTTP_400_BAD_REQUEST)
+
+            user = request.user
+            scoped = f"{scope}:{user.id if user.is_authenticated else '-'}:{key}"
+            fingerprint = _fingerprint(request)
+            stored = replay_cache.get(scoped)
+            if stored is not None:
+                return _replay(fingerprint, stored)
+
+            coll = IdempotencyRecord._get_collection()
+            try:
+                coll.insert_one({"_id": scoped, "fingerprint": fingerprint, "state": "pending",
+                                 "created_at": datetime.utcnow()})
+            except DuplicateKeyError:
+                record = coll.find_one({"_id": scoped})
+                if record is None:  # expired or released in between
+                    return wrapper(request, *args, **kwargs)
+                if record["state"] == "done":
+                    stored = (record["fingerprint"], record["status_code"], record["body"])
+                    replay_cache.set(scoped, stored)
+                    return _replay(fingerprint, stored)
+                if record["fingerprint"] != fingerprint:
+                    return _mismatch()
+                return Response(
+                    {"detail": f"A request with this {HEADER} is still in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={"Retry-After": "1"},
+                )
+
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                coll.delete_one({"_id": scoped})
+                raise
+            if response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES:
+                coll.delete_one({"_id": scoped})
+                return response
+            body = JSONRenderer().render(response.data).decode()
+            coll.update_one(
+                {"_id": scoped},
+                {"$set": {"state": "done", "status_code": response.status_code, "body": body}},
+            )
+            replay_cache.set(scoped, (fingerprint, response.status_code, body))
+            return response
+
+        return wrapper
+
+    return decorator
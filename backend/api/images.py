@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+try:
+    from PIL import Image, ImageOps
+except Exception:  # Pillow is optional; without it only originals are served
+    Image = None
+
+from .models import Product, Store
+from .response_cache import storefront_cache
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each derivative
+VARIANTS = {"thumb": 200, "medium": 600, "large": 1200}
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def render_variants(path, url):
+    """Write resized WebP + JPEG/PNG derivatives of ``path`` next to it.
+
+    Returns ``{"original": url, "<variant>": {"webp": url, "<fallback>": url}}``.
+    """
+    base_dir = os.path.dirname(path)
+    out_dir = os.path.join(base_dir, "variants")
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    url_prefix = url.rsplit("/", 1)[0] + "/variants/"
+
+    result = {"original": url}
+    with Image.open(path) as src:
+        src = ImageOps.exif_transpose(src)
+        alpha = _has_alpha(src)
+        fallback = "png" if alpha else "jpg"
+        # Content-addressed originals (api/storage.py) make re-uploads produce
+        # the same stem, so existing derivatives can be reused as-is
+        names = {name: {ext: f"{stem}-{name}.{ext}" for ext in ("webp", fallback)} for name in VARIANTS}
+        if all(os.path.exists(os.path.join(out_dir, f)) for files in names.values() for f in files.values()):
+            result.update({
+                name: {ext: url_prefix + f for ext, f in files.items()} for name, files in names.items()
+            })
+            return result
+        src = src.convert("RGBA" if alpha else "RGB")
+        for name, edge in VARIANTS.items():
+            img = src.copy()
+            img.thumbnail((edge, edge), Image.LANCZOS)
+            urls = {}
+            for fmt, ext, opts in (
+                ("WEBP", "webp", {"quality": 80, "method": 4}),
+                ("PNG" if alpha else "JPEG", fallback, {"optimize": True} if alpha else {"quality": 82, "optimize": True, "progressive": True}),
+            ):
+                filename = names[name][ext]
+                img.save(os.path.join(out_dir, filename), fmt, **opts)
+                urls[ext] = url_prefix + filename
+            result[name] = urls
+    return result
+
+
+class ImagePipeline:
+    """Worker pool generating image derivatives off the request thread."""
+
+    def __init__(self, workers=2, keep_timings=200):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.timings = deque(maxlen=keep_timings)
+
+    @property
+    def enabled(self):
+        return Image is not None and getattr(settings, "IMAGE_VARIANTS_ENABLED", True)
+
+    def submit(self, fn, *args):
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-variants")
+        return self._executor.submit(self._run, fn, *args)
+
+    def product_images(self, product_id, store_id, files):
+        """Queue derivatives for ``files``: a list of ``(path, url)`` of saved originals."""
+        if files:
+            return self.submit(self._product_images, product_id, store_id, files)
+
+    def store_logo(self, store_id, slug, path, url):
+        return self.submit(self._store_logo, store_id, slug, path, url)
+
+    def stats(self):
+        items = list(self.timings)
+        ms = sorted(t["ms"] for t in items)
+        return {
+            "enabled": self.enabled,
+            "processed": len(items),
+            "p50_ms": ms[len(ms) // 2] if ms else None,
+            "max_ms": ms[-1] if ms else None,
+            "recent": items[-20:],
+        }
+
+    def _run(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("Image derivative job failed")
+
+    def _render(self, path, url):
+        start = time.perf_counter()
+        variants = render_variants(path, url)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.timings.append({"file": os.path.basename(path), "ms": round(elapsed, 1)})
+        logger.info("Rendered %d variants of %s in %.1f ms", len(VARIANTS), path, elapsed)
+        return variants
+
+    def _product_images(self, product_id, store_id, files):
+        entries = [self._render(path, url) for path, url in files]
+        Product.objects(id=product_id).update_one(push_all__image_variants=entries)
+        storefront_cache.invalidate_products(store_id)
+
+    def _store_logo(self, store_id, slug, path, url):
+        variants = self._render(path, url)
+        # Skip if the logo was replaced while this one was processing
+        Store.objects(id=store_id, logo_url=url).update_one(set__logo_variants=variants)
+        storefront_cache.invalidate_store(slug)
+
+
+image_pipeline = ImagePipeline(workers=getattr(settings, "IMAGE_WORKERS", 2))
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+from mongoengine import ValidationError
+
+from .models import Product
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(upload, requested=None):
+    fmt = (requested or "").lower()
+    if fmt in ("csv", "ndjson"):
+        return fmt
+    name = (getattr(upload, "name", "") or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (getattr(upload, "content_type", "") or ""):
+        return "ndjson"
+    return "csv"
+
+
+def iter_rows(upload, fmt):
+    """Yield ``(line_number, row_dict_or_error)`` from an uploaded file, one line at a time."""
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "ndjson":
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_no, ValueError(f"Invalid JSON: {e}")
+                    continue
+                yield line_no, row if isinstance(row, dict) else ValueError("Each line must be a JSON object")
+        else:
+            reader = csv.DictReader(text)
+            for row in reader:
+                # Multi-value columns use "|" as separator in CSV
+                for key in ("images", "image_alts"):
+                    if row.get(key):
+                        row[key] = [v.strip() for v in row[key].split("|") if v.strip()]
+                yield reader.line_num, row
+    finally:
+        text.detach()
+
+
+def _product_from_row(row, store, owner):
+    def text(key):
+        value = row.get(key)
+        return value.strip() if isinstance(value, str) else value
+
+    def listing(key):
+        value = row.get(key) or []
+        return value if isinstance(value, list) else [value]
+
+    return Product(
+        store=store,
+        owner=owner,
+        name=text("name") or None,
+        description=text("description") or None,
+        images=listing("images"),
+        image_alts=listing("image_alts"),
+        current_price=text("current_price") or None,
+        old_price=text("old_price") or None,
+        stock=text("stock") or None,
+    )
+
+
+def import_products(rows, store, owner, batch_size=1000):
+    """Validate rows against the Product schema and insert them with ``insert_many`` batches.
+
+    Only one batch is held in memory at a time. Returns a report with the
+    number of inserted rows and the errors of rejected rows (line number,
+    field messages), truncated to ``MAX_REPORTED_ERRORS`` entries.
+    """
+    coll = Product._get_collection()
+    report = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    batch = []
+
+    def flush():
+        if batch:
+            coll.insert_many(batch, ordered=False)
+            report["inserted"] += len(batch)
+            batch.clear()
+
+    def reject(line_no, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": line_no, "errors": errors})
+        else:
+            report["errors_truncated"] = True
+
+    for line_no, row in rows:
+        if isinstance(row, Exception):
+            reject(line_no, {"__all__": str(row)})
+            continue
+        product = _product_from_row(row, store, owner)
+        try:
+            product.validate()
+        except ValidationError as e:
+            reject(line_no, {k: str(v) for k, v in (e.to_dict() or {"__all__": e.message}).items()})
+            continue
+        batch.append(product.to_mongo().to_dict())
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return report
@@ -0,0 +1,236 @@
+"""Per-request MongoDB instrumentation and Prometheus metrics.
+
+``db_listener`` is a pymongo command listener registered globally in
+settings before the MongoEngine connection is made, so every client (sync
+and async) reports to it. ``DBInstrumentationMiddleware`` opens a
+``RequestStats`` per request in a context variable; the listener adds each
+command's duration to it, and keeps slow commands with the shape of their
+filter (values replaced by ``"?"``). The middleware then sets a
+``Server-Timing`` header and folds the numbers into per-route histograms
+served by ``/api/metrics`` in the Prometheus text format.
+
+Commands issued outside a request (background threads, streamed response
+bodies after the view returns) are not attributed to any route. Metrics are
+per process: scrape every worker.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+_current = ContextVar("db_request_stats", default=None)
+
+# Where each command keeps the filter worth showing for a slow command
+_FILTER_KEYS = {"find": "filter", "count": "query", "distinct": "query", "findAndModify": "query"}
+
+
+def query_shape(value):
+    """``value`` with every literal replaced by ``"?"``, keeping keys and operators."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(v) for v in value[:3]]
+    return "?"
+
+
+def command_shape(name, command):
+    if name in _FILTER_KEYS:
+        return query_shape(command.get(_FILTER_KEYS[name]) or {})
+    if name == "aggregate":
+        shape = []
+        for stage in command.get("pipeline") or []:
+            op, body = next(iter(stage.items()))
+            shape.append({op: query_shape(body) if op == "$match" else "..."})
+        return shape
+    for key, field in (("updates", "q"), ("deletes", "q")):
+        if command.get(key):
+            return query_shape(command[key][0].get(field) or {})
+    return None
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "slow", "_pending")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slow = []
+        self._pending = {}
+
+
+class DBCommandListener(monitoring.CommandListener):
+    def started(self, event):
+        stats = _current.get()
+        if stats is not None:
+            stats._pending[event.request_id] = (event.command_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        stats = _current.get()
+        if stats is None:
+            return
+        name, command = stats._pending.pop(event.request_id, (event.command_name, None))
+        seconds = event.duration_micros / 1e6
+        stats.queries += 1
+        stats.db_seconds += seconds
+        if seconds * 1000 >= settings.DB_SLOW_COMMAND_MS and command is not None:
+            stats.slow.append({
+                "command": name,
+                "collection": command.get(name) if isinstance(command.get(name), str) else None,
+                "shape": command_shape(name, command),
+                "ms": round(seconds * 1000, 1),
+            })
+
+
+db_listener = DBCommandListener()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Process-local request/DB histograms and counters, rendered in the Prometheus text format."""
+
+    HISTOGRAMS = {
+        "shopper_http_request_duration_seconds": ("Request latency", DURATION_BUCKETS),
+        "shopper_db_time_seconds": ("MongoDB time per request", DURATION_BUCKETS),
+        "shopper_db_queries_per_request": ("MongoDB commands per request", QUERY_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self.HISTOGRAMS}
+            self._responses = {}
+            self._slow = {}
+
+    def observe(self, route, method, status, seconds, stats):
+        labels = (("route", route), ("method", method))
+        with self._lock:
+            for name, value in (
+                ("shopper_http_request_duration_seconds", seconds),
+                ("shopper_db_time_seconds", stats.db_seconds),
+                ("shopper_db_queries_per_request", stats.queries),
+            ):
+                series = self._histograms[name]
+                if labels not in series:
+                    series[labels] = _Histogram(self.HISTOGRAMS[name][1])
+                series[labels].observe(value)
+            key = labels + (("status", str(status)),)
+            self._responses[key] = self._responses.get(key, 0) + 1
+            for cmd in stats.slow:
+                key = labels + (("command", cmd["command"]), ("collection", cmd["collection"] or ""))
+                self._slow[key] = self._slow.get(key, 0) + 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (doc, _) in self.HISTOGRAMS.items():
+                lines += [f"# HELP {name} {doc}", f"# TYPE {name} histogram"]
+                for labels, h in sorted(self._histograms[name].items()):
+                    for bound, count in zip(h.buckets, h.counts):
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(h.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {h.count}")
+            for name, doc, values in (
+                ("shopper_http_responses_total", "Responses by status", self._responses),
+                ("shopper_db_slow_commands_total", "Commands slower than DB_SLOW_COMMAND_MS", self._slow),
+            ):
+                lines += [f"# HELP {name} {doc}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_labels(labels)} {count}" for labels, count in sorted(values.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+metrics = Metrics()
+
+
+class DBInstrumentationMiddleware:
+    """Attribute MongoDB commands to the request, add ``Server-Timing`` and record route metrics."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token, start = self._begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._end(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, token, start = self._begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._end(request, response, stats, start)
+
+    def _begin(self):
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def _end(self, request, response, stats, start):
+        seconds = time.perf_counter() - start
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match and match.route else "unmatched"
+        metrics.observe(route, request.method, response.status_code, seconds, stats)
+        response["Server-Timing"] = (
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", app;dur={seconds * 1000:.1f}'
+        )
+        for cmd in stats.slow:
+            logger.warning("Slow MongoDB %s on %s (%.1f ms) in %s %s: %s",
+                           cmd["command"], cmd["collection"], cmd["ms"], request.method, route, cmd["shape"])
+        return response
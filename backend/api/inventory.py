@@ -0,0 +1,119 @@
+"""Stock limits on purchases.
+
+``Product.stock`` is the number of units left; ``None`` (the default, and
+every product created before stock existed) means unlimited. Purchases
+take stock with one atomic update per product and never read it first, so
+concurrent buyers cannot oversell and no lock is needed:
+
+- ``products/buy`` sends ``purchase_update`` (an update pipeline) to the
+  product. It only moves ``stock`` and ``orders_count`` when enough units
+  are left, and the document it returns (as it was before the update) tells
+  a sale from a sold-out product in the same round trip.
+- ``orders/checkout`` takes each limited product with a filtered
+  ``$inc`` (``stock >= quantity``) and puts back what it already took when
+  a later line is sold out.
+"""
+from pymongo import ReturnDocument, UpdateOne
+
+from . import counters
+from .models import Product
+
+
+class SoldOut(Exception):
+    """Some products do not have enough stock left; ``ids`` lists them."""
+
+    def __init__(self, ids):
+        super().__init__(ids)
+        self.ids = ids
+
+
+def parse_stock(value):
+    """Stock from request data: blank means unlimited (``None``), else a non-negative integer."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError("stock must be a non-negative integer")
+    try:
+        stock = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("stock must be a non-negative integer")
+    if stock < 0 or str(stock) != str(value).strip():
+        raise ValueError("stock must be a non-negative integer")
+    return stock
+
+
+def in_stock(doc, quantity):
+    stock = doc.get("stock")
+    return stock is None or stock >= quantity
+
+
+def purchase_update(quantity, count_unlimited=True):
+    """``count_unlimited=False`` leaves ``orders_count`` of unlimited products alone (sharded counters)."""
+    # $ifNull: products without stock are always available; their stock stays null
+    available = {"$gte": [{"$ifNull": ["$stock", quantity]}, quantity]}
+    if not count_unlimited:
+        available = {"$and": [available, {"$ne": [{"$ifNull": ["$stock", None]}, None]}]}
+    return [{"$set": {
+        "orders_count": {"$add": [{"$ifNull": ["$orders_count", 0]}, {"$cond": [available, quantity, 0]}]},
+        "stock": {"$cond": [available, {"$subtract": ["$stock", quantity]}, "$stock"]},
+    }}]
+
+
+def purchase(product_id, quantity=1, projection=None):
+    """Sell ``quantity`` units of a product in one atomic update.
+
+    Returns the product as it was before (``None`` if it does not exist);
+    when ``in_stock(doc, quantity)`` is false nothing was changed. With
+    sharded counters, a sale of an unlimited product is counted in a shard.
+    """
+    sharded = counters.enabled()
+    fields = {"stock": 1, "orders_count": 1, **(projection or {})}
+    if sharded:
+        fields["store"] = 1
+    before = Product._get_collection().find_one_and_update(
+        {"_id": product_id},
+        purchase_update(quantity, count_unlimited=not sharded),
+        projection=fields,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if sharded and before and before.get("stock") is None:
+        counters.increment({product_id: (before.get("store"), quantity)})
+    return before
+
+
+def take_stock(quantities, products):
+    """Counter and stock updates for a cart, all or nothing.
+
+    ``products`` are the cart's documents as read for pricing (with
+    ``stock``). Lines of unlimited products are folded into one
+    ``bulk_write``; limited ones are taken one conditional update at a time
+    so a sold-out line can be told apart and what was taken put back.
+    Raises ``SoldOut`` without leaving any change behind.
+    """
+    coll = Product._get_collection()
+    short = [str(pid) for pid, qty in quantities.items() if not in_stock(products[pid], qty)]
+    if short:
+        raise SoldOut(short)
+
+    taken = []
+    for pid, qty in quantities.items():
+        if products[pid].get("stock") is None:
+            continue
+        result = coll.update_one({"_id": pid, "stock": {"$gte": qty}}, {"$inc": {"stock": -qty, "orders_count": qty}})
+        if not result.modified_count:
+            if taken:
+                coll.bulk_write(
+                    [UpdateOne({"_id": p}, {"$inc": {"stock": q, "orders_count": -q}}) for p, q in taken],
+                    ordered=False,
+                )
+            raise SoldOut([str(pid)])
+        taken.append((pid, qty))
+
+    unlimited = {pid: qty for pid, qty in quantities.items() if products[pid].get("stock") is None}
+    if counters.enabled():
+        counters.increment({pid: (products[pid].get("store"), qty) for pid, qty in unlimited.items()})
+    elif unlimited:
+        coll.bulk_write(
+            [UpdateOne({"_id": pid}, {"$inc": {"orders_count": qty}}) for pid, qty in unlimited.items()],
+            ordered=False,
+        )
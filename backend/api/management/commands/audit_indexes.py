@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import models
+from api.query_shapes import QUERY_SHAPES
+from mongoengine import Document
+
+
+def _stages(plan):
+    """Yield every stage name in an explain() plan, ignoring rejected plans."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+class Command(BaseCommand):
+    help = (
+        "Ensure declared indexes exist and fail if any registered query shape needs a COLLSCAN, "
+        "or an in-memory SORT for shapes that are streamed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skip-ensure", action="store_true", help="Only explain, do not create indexes")
+
+    def handle(self, *args, **opts):
+        if not opts["skip_ensure"]:
+            for doc in self._documents():
+                doc.ensure_indexes()
+                self.stdout.write(f"ensured indexes on {doc._get_collection_name()}")
+
+        failures = []
+        for name, shape in QUERY_SHAPES.items():
+            stages = set(_stages(self._explain(shape)))
+            if "COLLSCAN" in stages:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"COLLSCAN  {name}"))
+            elif "SORT" in stages and shape.get("streamed"):
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"SORT      {name}  (streamed, must follow an index)"))
+            else:
+                note = "  (in-memory sort)" if "SORT" in stages else ""
+                self.stdout.write(self.style.SUCCESS(f"ok        {name}{note}"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} query shape(s) need a collection scan or sort: {', '.join(failures)}")
+
+    def _documents(self):
+        for value in vars(models).values():
+            if isinstance(value, type) and issubclass(value, Document) and value is not Document and not value._meta.get("abstract"):
+                yield value
+
+    def _explain(self, shape):
+        coll = shape["document"]._get_collection()
+        if "pipeline" in shape:
+            return coll.database.command(
+                "explain",
+                {"aggregate": coll.name, "pipeline": shape["pipeline"], "cursor": {}},
+                verbosity="queryPlanner",
+            )
+        cursor = coll.find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        return cursor.explain()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = "Rebuild hourly/daily sales rollups from existing Orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--store", action="append", dest="stores", help="Limit to a store id (repeatable)")
+
+    def handle(self, *args, **opts):
+        processed = backfill(
+            batch_size=opts["batch_size"],
+            store_ids=opts["stores"],
+            log=lambda n: self.stdout.write(f"  {n} orders processed"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups from {processed} orders"))
@@ -0,0 +1,110 @@
+import threading
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+
+from api import counters, inventory
+from api.models import Product, ProductCounterShard, Store, User
+
+from .loadtest import _percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare orders_count increment throughput on one hot product: a single document against "
+        "PRODUCT_COUNTER_SHARDS shards, for bare increments and for the products/buy update path. "
+        "Checks after folding that no increment was lost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shards", type=int, nargs="+", default=[0, 4, 16, 64], help="0 = single document")
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per combination")
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--mongomock", action="store_true", help="Use mongomock instead of a local mongod")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        alias = "bench"
+        if opts["mongomock"]:
+            try:
+                import mongomock
+            except ImportError:
+                raise CommandError("--mongomock requires the mongomock package")
+            client = connect(alias=alias, db=opts["db"], host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+        else:
+            client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+        failures = []
+        try:
+            with ExitStack() as stack:
+                for document in (User, Store, Product, ProductCounterShard):
+                    stack.enter_context(switch_db(document, alias))
+                user = User(email="bench@example.com", password="x").save()
+                store = Store(owner=user, name="Viral", slug="viral").save()
+                for path in ("increment", "buy"):
+                    for shards in opts["shards"]:
+                        # Folding is left to the check below; the periodic folder would compete for the shards
+                        with override_settings(PRODUCT_COUNTER_SHARDS=shards), \
+                                mock.patch.object(counters.counter_folder, "interval", 0):
+                            product = Product(store=store, owner=user, name="Viral", current_price="5.00").save()
+                            failures += self._run(path, shards, product, store, opts)
+        finally:
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+        if failures:
+            raise CommandError("; ".join(failures))
+
+    def _run(self, path, shards, product, store, opts):
+        pid, store_id = product.id, store.id
+        coll = Product._get_collection()
+
+        if path == "buy":
+            def once():
+                inventory.purchase(pid, projection={"store": 1, "current_price": 1})
+        elif shards:
+            def once():
+                counters.increment({pid: (store_id, 1)})
+        else:
+            def once():
+                coll.update_one({"_id": pid}, {"$inc": {"orders_count": 1}})
+
+        latencies, lock = [], threading.Lock()
+        deadline = time.perf_counter() + opts["duration"]
+
+        def worker():
+            local = []
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                once()
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(opts["concurrency"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        counters.fold()
+        counted = coll.find_one({"_id": pid}, projection={"orders_count": 1}).get("orders_count", 0)
+        latencies.sort()
+        label = f"{shards} shards" if shards else "single doc"
+        self.stdout.write(
+            f"{path:<9} {label:<10} x{opts['concurrency']:<4} {len(latencies) / elapsed:10.0f} increments/s  "
+            f"p50 {_percentile(latencies, 50) * 1000:6.2f} ms  p95 {_percentile(latencies, 95) * 1000:6.2f} ms  "
+            f"p99 {_percentile(latencies, 99) * 1000:6.2f} ms"
+        )
+        if counted != len(latencies):
+            return [f"{path} with {label}: {len(latencies)} increments but orders_count {counted} after folding"]
+        return []
+
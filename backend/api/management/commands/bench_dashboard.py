@@ -0,0 +1,95 @@
+import random
+import time
+from contextlib import ExitStack
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+
+from api.analytics import dashboard_breakdown_for, dashboard_summary_for
+from api.models import Product, Store
+
+
+def legacy_summary(store_ids):
+    # Per-store loop used by dashboard_summary before the aggregation pipeline
+    total_products = 0
+    total_orders = 0
+    total_revenue = 0
+    for sid in store_ids:
+        sdoc = Store.objects(id=sid).first()
+        if not sdoc:
+            continue
+        prods = Product.objects(store=sdoc)
+        total_products += prods.count()
+        for p in prods:
+            total_orders += int(p.orders_count or 0)
+            total_revenue += float(p.current_price or 0) * int(p.orders_count or 0)
+    return {
+        "totalStores": len(store_ids),
+        "totalProducts": total_products,
+        "totalOrders": total_orders,
+        "totalRevenue": total_revenue,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the dashboard aggregation pipeline against the legacy per-store loop on seeded data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stores", type=int, default=100)
+        parser.add_argument("--products", type=int, default=10000, help="Products per store")
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--skip-legacy", action="store_true")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        alias = "bench"
+        client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(switch_db(Store, alias))
+                stack.enter_context(switch_db(Product, alias))
+                store_ids = self._seed(opts["stores"], opts["products"])
+
+                timings = {"pipeline_summary": self._time(opts["runs"], dashboard_summary_for, store_ids)}
+                timings["pipeline_breakdown"] = self._time(opts["runs"], dashboard_breakdown_for, store_ids)
+                if not opts["skip_legacy"]:
+                    timings["legacy_summary"] = self._time(opts["runs"], legacy_summary, store_ids)
+
+                for name, secs in timings.items():
+                    self.stdout.write(f"{name:<20} best {min(secs) * 1000:10.1f} ms  mean {sum(secs) / len(secs) * 1000:10.1f} ms")
+                if "legacy_summary" in timings:
+                    speedup = min(timings["legacy_summary"]) / max(min(timings["pipeline_summary"]), 1e-9)
+                    self.stdout.write(self.style.SUCCESS(f"pipeline speedup: {speedup:.1f}x"))
+        finally:
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+
+    def _seed(self, stores, products):
+        self.stdout.write(f"Seeding {stores} stores x {products} products into the benchmark database...")
+        store_docs = [{"_id": ObjectId(), "name": f"Store {i}", "slug": f"bench-{i}"} for i in range(stores)]
+        Store._get_collection().insert_many(store_docs)
+        coll = Product._get_collection()
+        for s in store_docs:
+            batch = [{
+                "store": s["_id"],
+                "name": f"Product {j}",
+                "current_price": f"{random.uniform(1, 500):.2f}",
+                "orders_count": random.randint(0, 50),
+            } for j in range(products)]
+            if batch:
+                coll.insert_many(batch, ordered=False)
+        coll.create_index("store")
+        return [str(s["_id"]) for s in store_docs]
+
+    def _time(self, runs, fn, store_ids):
+        secs = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn(store_ids)
+            secs.append(time.perf_counter() - start)
+        return secs
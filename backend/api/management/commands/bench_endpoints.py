@@ -0,0 +1,360 @@
+import io
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from unittest import mock
+
+from bson import ObjectId
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+from pymongo import monitoring
+
+from api import urls as api_urls
+from api.models import Order, Product, Project, SalesRollup, Store, User
+from api.popularity import refresh as refresh_popularity
+from api.rollups import backfill as backfill_rollups
+from api.search import tokenize
+from api.views import OrderViewSet, ProjectViewSet, StoreViewSet
+
+from .loadtest import _percentile
+
+PASSWORD = "bench-password"
+
+
+class _QueryCounter(monitoring.CommandListener):
+    """Counts commands issued by the current thread (pymongo publishes events on the calling thread)."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def reset(self):
+        self.local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self.local, "count", 0)
+
+    def started(self, event):
+        self.local.count = self.count + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _csv_upload(i):
+    rows = "\n".join(f"Imported {i}-{n},Bench import,{n + 1}.50,," for n in range(10))
+    upload = io.BytesIO(f"name,description,current_price,old_price,images\n{rows}\n".encode())
+    upload.name = "products.csv"
+    return upload
+
+
+# (route, label, method, build(ctx, i) -> (path, kwargs), authenticated)
+# ``route`` is the pattern string in api/urls.py; router routes use their prefix.
+ROUTES = [
+    ("health", "health", "get", lambda c, i: ("/api/health", {}), False),
+    ("metrics", "metrics", "get", lambda c, i: ("/api/metrics", {}), False),
+    ("db/pool-stats", "db/pool-stats", "get", lambda c, i: ("/api/db/pool-stats", {}), False),
+    ("storefront/cache-stats", "storefront/cache-stats", "get", lambda c, i: ("/api/storefront/cache-stats", {}), False),
+    ("media/pipeline-stats", "media/pipeline-stats", "get", lambda c, i: ("/api/media/pipeline-stats", {}), False),
+    ("auth/pool-stats", "auth/pool-stats", "get", lambda c, i: ("/api/auth/pool-stats", {}), False),
+    ("auth/register", "auth/register", "post", lambda c, i: ("/api/auth/register", {
+        "data": {"email": f"new-{c['tag']}-{i}@bench.example.com", "password": PASSWORD},
+        "content_type": "application/json",
+    }), False),
+    ("auth/login", "auth/login", "post", lambda c, i: ("/api/auth/login", {
+        "data": {"email": c["email"], "password": PASSWORD}, "content_type": "application/json",
+    }), False),
+    ("auth/me", "auth/me", "get", lambda c, i: ("/api/auth/me", {}), True),
+    ("auth/update", "auth/update", "put", lambda c, i: ("/api/auth/update", {
+        "data": {"phone": f"+1555{i:07d}"}, "content_type": "application/json",
+    }), True),
+    ("projects/mine", "projects/mine", "get", lambda c, i: ("/api/projects/mine", {}), True),
+    ("stores/create", "stores/create", "post", lambda c, i: ("/api/stores/create", {
+        "data": {"name": f"Bench new {c['tag']} {i}", "store_type": "fashion"}, "content_type": "application/json",
+    }), True),
+    ("stores/by-slug/<slug>", "stores/by-slug", "get",
+     lambda c, i: (f"/api/stores/by-slug/{c['rng'].choice(c['slugs'])}", {}), False),
+    ("stores/directory", "stores/directory", "get", lambda c, i: ("/api/stores/directory", {}), False),
+    ("stores/update/<sid>", "stores/update", "put", lambda c, i: (f"/api/stores/update/{c['own_store']}", {
+        "data": {"quote": f"Quote {i}"}, "content_type": "application/json",
+    }), True),
+    (r"^stores/(?P<sid>[^/]+)/export/(?P<kind>orders|products)$", "stores/export/orders", "get",
+     lambda c, i: (f"/api/stores/{c['own_store']}/export/orders", {}), True),
+    (r"^stores/(?P<sid>[^/]+)/export/(?P<kind>orders|products)$", "stores/export/products.csv", "get",
+     lambda c, i: (f"/api/stores/{c['own_store']}/export/products?fmt=csv", {}), True),
+    ("products/create", "products/create", "post", lambda c, i: ("/api/products/create", {
+        "data": {"store_id": c["own_store"], "name": f"Bench created {i}", "current_price": "9.99"},
+        "content_type": "application/json",
+    }), True),
+    ("products/import", "products/import", "post", lambda c, i: ("/api/products/import", {
+        "data": {"store_id": c["own_store"], "file": _csv_upload(i)},
+    }), True),
+    ("products/by-slug/<slug>", "products/by-slug", "get",
+     lambda c, i: (f"/api/products/by-slug/{c['rng'].choice(c['slugs'])}", {}), False),
+    ("products/search", "products/search", "get",
+     lambda c, i: ("/api/products/search", {"data": {"q": c["rng"].choice(["bench", "product 1", "gadg"])}}), False),
+    ("products/update/<pid>", "products/update", "put", lambda c, i: (f"/api/products/update/{c['own_product']}", {
+        "data": {"description": f"Updated {i}"}, "content_type": "application/json",
+    }), True),
+    ("products/buy/<pid>", "products/buy", "post",
+     lambda c, i: (f"/api/products/buy/{c['rng'].choice(c['products'])}", {}), False),
+    ("orders/checkout", "orders/checkout (10 items)", "post", lambda c, i: ("/api/orders/checkout", {
+        "data": {"items": [[pid, 1 + j % 3] for j, pid in enumerate(c["rng"].sample(c["products"], 10))]},
+        "content_type": "application/json",
+    }), False),
+    ("dashboard/summary", "dashboard/summary", "get", lambda c, i: ("/api/dashboard/summary", {}), True),
+    ("dashboard/breakdown", "dashboard/breakdown", "get", lambda c, i: ("/api/dashboard/breakdown", {}), True),
+    ("dashboard/timeseries", "dashboard/timeseries", "get", lambda c, i: ("/api/dashboard/timeseries", {}), True),
+    ("projects", "projects (list)", "get", lambda c, i: ("/api/projects/", {}), False),
+    ("stores", "stores (list)", "get", lambda c, i: ("/api/stores/", {}), False),
+    ("stores", "stores (detail)", "get", lambda c, i: (f"/api/stores/{c['rng'].choice(c['stores'])}/", {}), False),
+    ("orders", "orders (list)", "get", lambda c, i: ("/api/orders/", {}), False),
+]
+
+# The async views keep an AsyncMongoClient bound to one event loop, while the
+# test client runs each async request in a fresh loop: drive them with
+# ``manage.py loadtest`` against an ASGI server instead. dashboard/stream is a
+# long-lived event stream, not a request/response round trip.
+SKIPPED_PREFIXES = ("async/", "dashboard/stream")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, stores, products and orders into a scratch database, drive every route of "
+        "api/urls.py through the Django test client under concurrency and report latency "
+        "percentiles, throughput and Mongo commands per request. Results are written as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--stores-per-user", type=int, default=3)
+        parser.add_argument("--products-per-store", type=int, default=200)
+        parser.add_argument("--orders-per-store", type=int, default=500)
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--only", action="append", help="Only endpoints whose label starts with this (repeatable)")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--mongomock", action="store_true", help="Use mongomock instead of a local mongod")
+        parser.add_argument("--output", default="bench-results.json")
+        parser.add_argument("--baseline", help="Earlier --output file to compare against")
+        parser.add_argument("--max-regression", type=float,
+                            help="Fail when an endpoint's p95 grows by more than this percentage over the baseline")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        self._check_coverage()
+        counter = _QueryCounter()
+        alias = "bench"
+        if opts["mongomock"]:
+            try:
+                import mongomock
+            except ImportError:
+                raise CommandError("--mongomock requires the mongomock package")
+            client = connect(alias=alias, db=opts["db"], host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+            counter = None  # mongomock does not publish command events
+        else:
+            monitoring.register(counter)  # before connect(): listeners apply to clients created afterwards
+            client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+
+        try:
+            with ExitStack() as stack:
+                for document in (User, Project, Store, Product, Order, SalesRollup):
+                    stack.enter_context(switch_db(document, alias))
+                # Viewset querysets are built at import time, bound to the default connection
+                for viewset in (ProjectViewSet, StoreViewSet, OrderViewSet):
+                    stack.enter_context(mock.patch.object(
+                        viewset, "queryset", viewset.document.objects.order_by("-created_at")
+                    ))
+                stack.enter_context(override_settings(
+                    DJANGO_MONGODB_DB=opts["db"], MONGODB_READ_ALIAS=alias, ORDER_WRITE_MODE="sync"
+                ))
+                for name in ("default", settings.STOREFRONT_CACHE_ALIAS):
+                    caches[name].clear()
+                ctx = self._seed(opts)
+                ctx["clients"] = self._clients(ctx, opts["concurrency"])
+                results = {}
+                for route, label, method, build, authenticated in ROUTES:
+                    if opts["only"] and not label.startswith(tuple(opts["only"])):
+                        continue
+                    results[label] = self._drive(ctx, counter, method, build, opts)
+                    results[label]["route"] = route
+                    self._print(label, results[label])
+        finally:
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+
+        report = {
+            "meta": {
+                "created_at": datetime.utcnow().isoformat() + "Z",
+                "backend": "mongomock" if opts["mongomock"] else "mongod",
+                **{k: opts[k] for k in ("users", "stores_per_user", "products_per_store", "orders_per_store",
+                                        "requests", "warmup", "concurrency", "seed")},
+            },
+            "endpoints": results,
+        }
+        with open(opts["output"], "w") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {opts['output']}"))
+        if opts["baseline"]:
+            self._compare(results, opts["baseline"], opts["max_regression"])
+
+    def _check_coverage(self):
+        covered = {route for route, *_ in ROUTES}
+        for pattern in api_urls.urlpatterns:
+            route = str(pattern.pattern)
+            if route == "":  # router include
+                continue
+            if route not in covered and not route.startswith(SKIPPED_PREFIXES):
+                self.stdout.write(self.style.WARNING(f"Route not benchmarked: {route}"))
+        for prefix, *_ in api_urls.router.registry:
+            if prefix not in covered:
+                self.stdout.write(self.style.WARNING(f"Router prefix not benchmarked: {prefix}"))
+
+    def _seed(self, opts):
+        self.stdout.write("Seeding the benchmark database...")
+        rng = random.Random(opts["seed"])
+        now = datetime.utcnow()
+        password = make_password(PASSWORD)  # hashed once, shared by every seeded user
+        users, projects, stores, products, orders = [], [], [], [], []
+        for u in range(opts["users"]):
+            user = {"_id": ObjectId(), "email": f"user{u}@bench.example.com", "password": password,
+                    "name": f"Bench user {u}", "role": "owner", "stores": {}, "created_at": now}
+            project = {"_id": ObjectId(), "owner": user["_id"], "name": f"Project {u}", "created_at": now}
+            for s in range(opts["stores_per_user"]):
+                store = {"_id": ObjectId(), "project": project["_id"], "owner": user["_id"],
+                         "name": f"Bench store {u}-{s}", "slug": f"bench-{u}-{s}",
+                         "store_type": rng.choice(["fashion", "food", "tech"]), "navbar_enabled": True,
+                         "logo_position": "left", "logo_variants": {}, "popularity": 0.0,
+                         "created_at": now - timedelta(days=s)}
+                user["stores"][store["name"]] = str(store["_id"])
+                stores.append(store)
+                for p in range(opts["products_per_store"]):
+                    name = f"Bench product {p} {rng.choice(['gadget', 'shirt', 'lamp', 'mug'])}"
+                    products.append({
+                        "store": store["_id"], "owner": user["_id"], "name": name, "description": "Seeded",
+                        "images": [], "image_alts": [], "image_variants": [],
+                        "current_price": f"{rng.uniform(1, 200):.2f}", "orders_count": rng.randint(0, 100),
+                        "name_tokens": tokenize(name), "search_tokens": tokenize(name, "Seeded"),
+                        "created_at": now - timedelta(seconds=p),
+                    })
+                orders.extend({
+                    "store": store["_id"], "total": f"{rng.uniform(1, 200):.2f}",
+                    "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+                } for _ in range(opts["orders_per_store"]))
+            users.append(user)
+            projects.append(project)
+
+        for document, docs in ((User, users), (Project, projects), (Store, stores), (Product, products), (Order, orders)):
+            document.ensure_indexes()
+            for start in range(0, len(docs), 10000):
+                document._get_collection().insert_many(docs[start:start + 10000], ordered=False)
+        SalesRollup.ensure_indexes()
+        backfill_rollups()
+        refresh_popularity()
+
+        owner = users[0]
+        own_stores = [s["_id"] for s in stores if s["owner"] == owner["_id"]]
+        return {
+            "tag": uuid.uuid4().hex[:8],
+            "email": owner["email"],
+            "own_store": str(own_stores[0]),
+            "own_product": str(next(p["_id"] for p in products if p["store"] == own_stores[0])),
+            "slugs": [s["slug"] for s in stores],
+            "stores": [str(s["_id"]) for s in stores],
+            "products": [str(p["_id"]) for p in products[:1000]],
+            "rng": rng,
+        }
+
+    def _clients(self, ctx, count):
+        """One logged-in test client per worker, reused across endpoints (public routes ignore the cookie)."""
+        clients = queue.SimpleQueue()
+        for _ in range(count):
+            # Report view errors as 500s instead of raising them into the benchmark
+            client = Client(raise_request_exception=False)
+            client.post("/api/auth/login", {"email": ctx["email"], "password": PASSWORD}, content_type="application/json")
+            clients.put(client)
+        return clients
+
+    def _drive(self, ctx, counter, method, build, opts):
+        sequence = iter(range(10 ** 9))
+        seq_lock = threading.Lock()
+
+        def one(_):
+            with seq_lock:
+                i = next(sequence)
+                path, kwargs = build(ctx, i)
+            client = ctx["clients"].get()
+            try:
+                if counter:
+                    counter.reset()
+                start = time.perf_counter()
+                resp = getattr(client, method)(path, **kwargs)
+                if getattr(resp, "streaming", False):
+                    b"".join(resp.streaming_content)
+                elapsed = time.perf_counter() - start
+            finally:
+                ctx["clients"].put(client)
+            return elapsed, resp.status_code, counter.count if counter else None
+
+        with ThreadPoolExecutor(max_workers=opts["concurrency"]) as pool:
+            list(pool.map(one, range(opts["warmup"])))
+            started = time.perf_counter()
+            samples = list(pool.map(one, range(opts["requests"])))
+            wall = time.perf_counter() - started
+
+        latencies = sorted(s[0] for s in samples)
+        queries = [s[2] for s in samples if s[2] is not None]
+        statuses = {}
+        for _, code, _ in samples:
+            statuses[str(code)] = statuses.get(str(code), 0) + 1
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for _, code, _ in samples if code >= 400),
+            "statuses": statuses,
+            "throughput_rps": len(samples) / wall if wall else 0.0,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p95_ms": _percentile(latencies, 95) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "mongo_queries_per_request": sum(queries) / len(queries) if queries else None,
+        }
+
+    def _print(self, label, r):
+        queries = "-" if r["mongo_queries_per_request"] is None else f"{r['mongo_queries_per_request']:.1f}"
+        line = (f"{label:<28} {r['throughput_rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f}  p95 {r['p95_ms']:7.1f}  "
+                f"p99 {r['p99_ms']:7.1f} ms  queries {queries:>5}  errors {r['errors']}")
+        self.stdout.write(self.style.ERROR(line) if r["errors"] else line)
+
+    def _compare(self, results, baseline_path, max_regression):
+        with open(baseline_path) as fh:
+            baseline = json.load(fh).get("endpoints", {})
+        regressions = []
+        self.stdout.write(f"Compared with {baseline_path}:")
+        for label, r in results.items():
+            old = baseline.get(label)
+            if not old:
+                continue
+            change = (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+            old_q, new_q = old.get("mongo_queries_per_request"), r["mongo_queries_per_request"]
+            queries = f"  queries {old_q:.1f} -> {new_q:.1f}" if old_q is not None and new_q is not None else ""
+            self.stdout.write(f"  {label:<28} p95 {old['p95_ms']:7.1f} -> {r['p95_ms']:7.1f} ms ({change:+.0f}%){queries}")
+            if max_regression is not None and change > max_regression:
+                regressions.append(label)
+        if regressions:
+            raise CommandError(f"p95 regressed by more than {max_regression}%: {', '.join(regressions)}")
@@ -0,0 +1,136 @@
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+
+from api.idempotency import replay_cache
+from api.models import IdempotencyRecord, Order, Product, SalesRollup, Store, User
+
+from .loadtest import _percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire a burst of concurrent retries of one buy request sharing an Idempotency-Key and check "
+        "that exactly one order was recorded; then time replays served by the database and by the "
+        "in-process cache against fresh (keyless) buys."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retries", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=300, help="Requests per latency phase")
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--mongomock", action="store_true", help="Use mongomock instead of a local mongod")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        alias = "bench"
+        if opts["mongomock"]:
+            try:
+                import mongomock
+            except ImportError:
+                raise CommandError("--mongomock requires the mongomock package")
+            client = connect(alias=alias, db=opts["db"], host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+        else:
+            client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+        try:
+            with ExitStack() as stack:
+                for document in (User, Store, Product, Order, SalesRollup, IdempotencyRecord):
+                    stack.enter_context(switch_db(document, alias))
+                stack.enter_context(override_settings(ORDER_WRITE_MODE="sync"))
+                replay_cache.clear()
+                user = User(email="bench@example.com", password="x").save()
+                store = Store(owner=user, name="Bench", slug=f"bench-{uuid.uuid4().hex[:8]}").save()
+                product = Product(store=store, owner=user, name="Widget", current_price="9.99").save()
+                self._burst(product, opts["retries"], opts["concurrency"])
+                self._latency(product, opts["requests"])
+        finally:
+            replay_cache.clear()
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+
+    def _buy(self, client, product, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return client.post(f"/api/products/buy/{product.id}", **headers)
+
+    def _burst(self, product, retries, concurrency):
+        key = uuid.uuid4().hex
+        statuses, latencies, lock = {}, [], threading.Lock()
+        remaining = iter(range(retries))
+
+        def worker():
+            client = Client(raise_request_exception=False)
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                start = time.perf_counter()
+                # A client retrying on 409 until the first attempt has finished
+                while True:
+                    response = self._buy(client, product, key)
+                    if response.status_code != 409:
+                        break
+                    time.sleep(0.001)
+                elapsed = time.perf_counter() - start
+                label = f"{response.status_code}{' replayed' if response.get('Idempotent-Replayed') else ''}"
+                with lock:
+                    statuses[label] = statuses.get(label, 0) + 1
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        orders = Order.objects(store=product.store.id).count()
+        orders_count = Product.objects(id=product.id).scalar("orders_count").first()
+        latencies.sort()
+        self.stdout.write(
+            f"burst: {retries} retries x{concurrency}  {retries / elapsed:8.0f} req/s  "
+            f"p50 {_percentile(latencies, 50) * 1000:6.2f} ms  p95 {_percentile(latencies, 95) * 1000:6.2f} ms  "
+            f"responses {dict(sorted(statuses.items()))}"
+        )
+        self.stdout.write(f"burst: orders recorded {orders}, product orders_count {orders_count}")
+        if orders != 1 or orders_count != 1 or statuses.get("200", 0) != 1:
+            raise CommandError("Retries with one Idempotency-Key must record exactly one order")
+        self.stdout.write(self.style.SUCCESS("burst: exactly one order recorded"))
+
+    def _latency(self, product, requests):
+        client = Client(raise_request_exception=False)
+        key = uuid.uuid4().hex
+        self._buy(client, product, key)
+
+        def timed(fn):
+            secs = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                fn()
+                secs.append(time.perf_counter() - start)
+            secs.sort()
+            return secs
+
+        def db_replay():
+            replay_cache.clear()
+            self._buy(client, product, key)
+
+        phases = (
+            ("fresh buy (no key)", lambda: self._buy(client, product)),
+            ("replay from database", db_replay),
+            ("replay from cache", lambda: self._buy(client, product, key)),
+        )
+        for label, fn in phases:
+            secs = timed(fn)
+            self.stdout.write(
+                f"{label:<22} p50 {_percentile(secs, 50) * 1000:6.2f} ms  p95 {_percentile(secs, 95) * 1000:6.2f} ms"
+            )
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.passwords import HashingPool, PasswordHashingBusy, _pbkdf2
+from api import passwords
+
+from .loadtest import _percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password verifications/sec (what login spends on hashing) through the hashing "
+        "pool for several PBKDF2 iteration counts, with concurrent callers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, nargs="+", default=[100_000, 300_000, 600_000, 1_000_000])
+        parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4],
+                            help="Pool sizes to compare (0 = on the calling thread)")
+        parser.add_argument("--queue-size", type=int, default=16)
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers, like request threads")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per combination")
+
+    def handle(self, *args, **opts):
+        original = passwords.hashing_pool
+        try:
+            for workers in opts["workers"]:
+                pool = HashingPool(workers, opts["queue_size"], timeout=30.0)
+                passwords.hashing_pool = pool
+                pool.run(_pbkdf2, "warm", "up", 1)  # start the worker processes outside the measurement
+                for iterations in opts["iterations"]:
+                    self._run(pool, workers, iterations, opts["concurrency"], opts["duration"])
+                if pool._executor is not None:
+                    pool._executor.shutdown()
+        finally:
+            passwords.hashing_pool = original
+
+    def _run(self, pool, workers, iterations, concurrency, duration):
+        encoded = passwords.hash_password("correct horse battery staple", iterations=iterations)
+        latencies, rejected = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def caller():
+            local, busy = [], 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    passwords.verify_password("correct horse battery staple", encoded)
+                    local.append(time.perf_counter() - start)
+                except PasswordHashingBusy:
+                    busy += 1
+                    time.sleep(0.01)  # a client honouring Retry-After, compressed
+            with lock:
+                latencies.extend(local)
+                rejected[0] += busy
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        self.stdout.write(
+            f"workers {workers:2d}  iterations {iterations:>9,}  {len(latencies) / elapsed:8.1f} logins/s  "
+            f"p50 {_percentile(latencies, 50) * 1000:8.1f} ms  p95 {_percentile(latencies, 95) * 1000:8.1f} ms  "
+            f"rejected {rejected[0]}"
+        )
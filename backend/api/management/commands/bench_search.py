@@ -0,0 +1,106 @@
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+
+from api.models import Product, Store
+from api.search import search_products, tokenize
+
+from .loadtest import _percentile
+
+ADJECTIVES = ["red", "blue", "green", "black", "white", "vintage", "organic", "handmade", "wireless", "leather",
+              "cotton", "wooden", "classic", "modern", "premium", "compact", "portable", "waterproof", "silk", "steel"]
+NOUNS = ["shoes", "shirt", "jacket", "lamp", "chair", "table", "headphones", "speaker", "watch", "bag",
+         "wallet", "scarf", "mug", "notebook", "backpack", "bottle", "candle", "sofa", "keyboard", "camera"]
+FILLER = ["perfect", "gift", "daily", "use", "durable", "lightweight", "comfortable", "design", "quality", "style",
+          "everyday", "travel", "home", "office", "outdoor", "summer", "winter", "soft", "strong", "elegant"]
+
+QUERIES = ["shoes", "red shoes", "vintage leather bag", "wirel", "head", "blue ja", "waterproof camera", "comfortable"]
+
+
+def legacy_search(q, store_id=None, limit=20):
+    # Unindexed case-insensitive regex over name/description, the obvious alternative
+    pattern = re.compile(re.escape(q.strip()), re.IGNORECASE)
+    query = {"$or": [{"name": pattern}, {"description": pattern}]}
+    if store_id is not None:
+        query["store"] = store_id
+    return list(Product._get_collection().find(query, {"name": 1}).limit(limit))
+
+
+class Command(BaseCommand):
+    help = "Seed a product corpus into a scratch database and report products/search latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1_000_000)
+        parser.add_argument("--stores", type=int, default=1000)
+        parser.add_argument("--runs", type=int, default=50, help="Runs per query")
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--skip-legacy", action="store_true")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        alias = "bench"
+        client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+        try:
+            with switch_db(Store, alias), switch_db(Product, alias):
+                store_ids = self._seed(opts["stores"], opts["products"])
+                rng = random.Random(7)
+                for q in QUERIES:
+                    self._report(f"search {q!r}", opts["runs"], lambda: search_products(q))
+                    sid = rng.choice(store_ids)
+                    self._report(f"search {q!r} in store", opts["runs"], lambda: search_products(q, store_id=sid))
+                    if not opts["skip_legacy"]:
+                        self._report(f"regex {q!r}", max(1, opts["runs"] // 10), lambda: legacy_search(q))
+        finally:
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+
+    def _seed(self, stores, products):
+        self.stdout.write(f"Seeding {products} products across {stores} stores into the benchmark database...")
+        rng = random.Random(42)
+        store_docs = [{"_id": ObjectId(), "name": f"Store {i}", "slug": f"bench-{i}"} for i in range(stores)]
+        Store._get_collection().insert_many(store_docs)
+        Product.ensure_indexes()
+        coll = Product._get_collection()
+        now = datetime.utcnow()
+        batch = []
+        for i in range(products):
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+            description = " ".join(rng.choices(FILLER + ADJECTIVES + NOUNS, k=12))
+            batch.append({
+                "store": store_docs[i % stores]["_id"],
+                "name": name.capitalize(),
+                "description": description,
+                "name_tokens": tokenize(name),
+                "search_tokens": tokenize(name, description),
+                "current_price": f"{rng.uniform(1, 500):.2f}",
+                "orders_count": rng.randint(0, 500),
+                "created_at": now - timedelta(seconds=i),
+            })
+            if len(batch) >= 10000:
+                coll.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            coll.insert_many(batch, ordered=False)
+        return [s["_id"] for s in store_docs]
+
+    def _report(self, label, runs, fn):
+        secs = []
+        hits = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = fn()
+            secs.append(time.perf_counter() - start)
+            hits = len(result[0] if isinstance(result, tuple) else result)
+        secs.sort()
+        self.stdout.write(
+            f"{label:<42} hits {hits:3d}  p50 {_percentile(secs, 50) * 1000:8.1f} ms  "
+            f"p95 {_percentile(secs, 95) * 1000:8.1f} ms  p99 {_percentile(secs, 99) * 1000:8.1f} ms"
+        )
@@ -0,0 +1,131 @@
+import json
+import random
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import order_serializer, product_serializer, project_serializer, store_serializer
+from api.models import Order, Product, Project, Store, User
+from api.serializers import OrderSerializer, ProductSerializer, ProjectSerializer, StoreSerializer
+
+PAIRS = [
+    ("projects", Project, ProjectSerializer, project_serializer),
+    ("stores", Store, StoreSerializer, store_serializer),
+    ("products", Product, ProductSerializer, product_serializer),
+    ("orders", Order, OrderSerializer, order_serializer),
+]
+
+
+def _render(data):
+    return json.loads(JSONRenderer().render(data))
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the raw serializers (FAST_SERIALIZATION) produce the same JSON as the "
+        "DocumentSerializers on seeded data, then compare their list throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Documents per collection")
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        alias = "bench"
+        client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+        mismatches = 0
+        try:
+            with ExitStack() as stack:
+                for document in (User, Project, Store, Product, Order):
+                    stack.enter_context(switch_db(document, alias))
+                self._seed(opts["rows"])
+                for name, document, drf_serializer, raw_serializer in PAIRS:
+                    mismatches += self._compare(name, document, drf_serializer, raw_serializer, opts["runs"])
+        finally:
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+        if mismatches:
+            raise CommandError(f"{mismatches} documents serialized differently")
+        self.stdout.write(self.style.SUCCESS("Raw serializers match the DocumentSerializers"))
+
+    def _seed(self, rows):
+        self.stdout.write(f"Seeding {rows} documents per collection into the benchmark database...")
+        rng = random.Random(3)
+        now = datetime.utcnow()
+        user = User(email="bench@example.com", password="x").save()
+        project = Project(owner=user, name="Bench").save()
+        Project._get_collection().insert_many(
+            [{"owner": user.id, "name": f"Project {i}", "created_at": now - timedelta(minutes=i)} for i in range(rows - 1)]
+        )
+        stores = [{
+            "_id": ObjectId(),
+            "project": project.id,
+            "owner": user.id,
+            "name": f"Store {i}",
+            "slug": f"bench-{i}",
+            "store_type": rng.choice(["fashion", "food", None]),
+            "logo_variants": {"thumb": {"webp": f"/media/variants/{i}.webp"}} if i % 2 else {},
+            "created_at": now - timedelta(minutes=i),
+        } for i in range(rows)]
+        # Half the stores rely on model defaults for the fields left out
+        for doc in stores[::2]:
+            doc.pop("store_type")
+        Store._get_collection().insert_many(stores)
+        Product._get_collection().insert_many([{
+            "store": stores[i % len(stores)]["_id"],
+            "owner": user.id,
+            "name": f"Product {i}",
+            "description": "Lorem ipsum" if i % 3 else None,
+            "images": [f"/media/products/{i}.jpg"],
+            "current_price": f"{rng.uniform(1, 500):.2f}",
+            "old_price": f"{rng.uniform(1, 500):.1f}" if i % 4 else None,
+            "orders_count": rng.randint(0, 50),
+            "created_at": now - timedelta(seconds=i, microseconds=rng.randint(0, 999) * 1000),
+        } for i in range(rows)])
+        Order._get_collection().insert_many([{
+            "store": stores[i % len(stores)]["_id"],
+            "total": f"{rng.uniform(1, 500):.2f}",
+            "created_at": now - timedelta(seconds=i),
+        } for i in range(rows)])
+
+    def _compare(self, name, document, drf_serializer, raw_serializer, runs):
+        def drf():
+            qs = document.objects.order_by("-created_at").only(*drf_serializer.Meta.fields).no_dereference()
+            return drf_serializer(qs, many=True).data
+
+        def raw():
+            qs = document.objects.order_by("-created_at").only(*raw_serializer.fields).as_pymongo()
+            return raw_serializer.many(qs)
+
+        expected, actual = _render(drf()), _render(raw())
+        mismatches = sum(1 for a, b in zip(expected, actual) if a != b) + abs(len(expected) - len(actual))
+        for a, b in zip(expected, actual):
+            if a != b:
+                diff = {k: (a.get(k), b.get(k)) for k in a.keys() | b.keys() if a.get(k) != b.get(k)}
+                self.stdout.write(self.style.ERROR(f"{name} {a.get('id')}: {diff}"))
+                break
+
+        timings = {}
+        for label, fn in (("drf", drf), ("raw", raw)):
+            secs = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                fn()
+                secs.append(time.perf_counter() - start)
+            timings[label] = min(secs)
+        rows = len(expected)
+        self.stdout.write(
+            f"{name:<9} {rows} rows  drf {rows / timings['drf']:10.0f} rows/s  raw {rows / timings['raw']:10.0f} rows/s  "
+            f"speedup {timings['drf'] / max(timings['raw'], 1e-9):5.1f}x  mismatches {mismatches}"
+        )
+        return mismatches
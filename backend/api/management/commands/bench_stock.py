@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_db
+
+from api.models import Order, Product, SalesRollup, Store, User
+
+from .loadtest import _percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Flash-sale stress test: hundreds of concurrent buyers go after a few limited products through "
+        "products/buy and orders/checkout until they sell out. Fails on any oversell or on orders that "
+        "do not match the stock taken, and reports purchase throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=300, help="Concurrent buyer threads")
+        parser.add_argument("--stock", type=int, default=1000, help="Units of each limited product")
+        parser.add_argument("--products", type=int, default=3, help="Limited products on sale")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--db", default=f"{settings.DJANGO_MONGODB_DB}_bench")
+        parser.add_argument("--mongomock", action="store_true",
+                            help="Use mongomock instead of a local mongod (its updates are not atomic across threads, "
+                                 "so expect it to oversell: only a real server proves anything)")
+        parser.add_argument("--keep", action="store_true", help="Do not drop the benchmark database")
+
+    def handle(self, *args, **opts):
+        alias = "bench"
+        if opts["mongomock"]:
+            try:
+                import mongomock
+            except ImportError:
+                raise CommandError("--mongomock requires the mongomock package")
+            client = connect(alias=alias, db=opts["db"], host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+        else:
+            client = connect(alias=alias, host=settings.DJANGO_MONGODB_URI, db=opts["db"])
+        failures = []
+        try:
+            with ExitStack() as stack:
+                for document in (User, Store, Product, Order, SalesRollup):
+                    stack.enter_context(switch_db(document, alias))
+                stack.enter_context(override_settings(ORDER_WRITE_MODE="sync"))
+                user = User(email="bench@example.com", password="x").save()
+                for mode in ("buy", "checkout"):
+                    store = Store(owner=user, name=f"Flash {mode}", slug=f"flash-{uuid.uuid4().hex[:8]}").save()
+                    products = [
+                        Product(store=store, owner=user, name=f"Item {i}", current_price="10.00", stock=opts["stock"]).save()
+                        for i in range(opts["products"])
+                    ]
+                    failures += self._run(mode, store, products, opts)
+        finally:
+            if not opts["keep"]:
+                client.drop_database(opts["db"])
+            disconnect(alias)
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No oversell: every unit sold matches an order line"))
+
+    def _run(self, mode, store, products, opts):
+        ids = [str(p.id) for p in products]
+        lock = threading.Lock()
+        statuses, latencies = {}, []
+        on_sale = list(ids)
+        start_barrier = threading.Barrier(opts["buyers"])
+
+        def buyer(n):
+            rng = random.Random(opts["seed"] * 100_003 + n)
+            client = Client(raise_request_exception=False)
+            local, counts = [], {}
+            start_barrier.wait()
+            while True:
+                with lock:
+                    left = list(on_sale)
+                if not left:
+                    break
+                if mode == "buy":
+                    pid = rng.choice(left)
+                    t0 = time.perf_counter()
+                    response = client.post(f"/api/products/buy/{pid}")
+                else:
+                    cart = rng.sample(left, min(len(left), 2))
+                    t0 = time.perf_counter()
+                    response = client.post(
+                        "/api/orders/checkout",
+                        {"items": [[pid, rng.randint(1, 3)] for pid in cart]},
+                        content_type="application/json",
+                    )
+                local.append(time.perf_counter() - t0)
+                counts[response.status_code] = counts.get(response.status_code, 0) + 1
+                if response.status_code == 409:
+                    # Sold out, or too few units left for this quantity: only keep asking for what is left.
+                    # Re-read every time, a checkout putting back units can make stock reappear.
+                    remaining = [str(doc["_id"]) for doc in Product.objects(id__in=ids, stock__gt=0).only("id").as_pymongo()]
+                    with lock:
+                        on_sale[:] = remaining
+                elif response.status_code not in (200, 201):
+                    with lock:
+                        on_sale.clear()  # unexpected error: stop the run, reported below
+            with lock:
+                latencies.extend(local)
+                for code, count in counts.items():
+                    statuses[code] = statuses.get(code, 0) + count
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=buyer, args=(n,)) for n in range(opts["buyers"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        failures = []
+        sold_units = {pid: 0 for pid in ids}
+        for order in Order.objects(store=store.id).as_pymongo():
+            if mode == "buy":
+                continue
+            for item in order.get("items", []):
+                sold_units[str(item["product"])] += item["quantity"]
+        orders = Order.objects(store=store.id).count()
+        for product in Product.objects(id__in=ids).as_pymongo():
+            pid, stock, orders_count = str(product["_id"]), product.get("stock"), product.get("orders_count", 0)
+            taken = opts["stock"] - stock
+            if mode == "buy":
+                sold_units[pid] = orders_count
+            if stock < 0 or taken != orders_count or taken != sold_units[pid]:
+                failures.append(
+                    f"{mode}: product {pid} stock {stock}, orders_count {orders_count}, units in orders {sold_units[pid]}"
+                )
+        if mode == "buy" and orders != statuses.get(200, 0):
+            failures.append(f"buy: {orders} orders for {statuses.get(200, 0)} successful purchases")
+        if set(statuses) - {200, 201, 409}:
+            failures.append(f"{mode}: unexpected responses {statuses}")
+
+        latencies.sort()
+        ok = statuses.get(200, 0) + statuses.get(201, 0)
+        self.stdout.write(
+            f"{mode:<8} {opts['buyers']} buyers  {len(latencies) / elapsed:8.0f} req/s  {ok / elapsed:8.0f} sales/s  "
+            f"p50 {_percentile(latencies, 50) * 1000:6.2f} ms  p95 {_percentile(latencies, 95) * 1000:6.2f} ms  "
+            f"units sold {sum(sold_units.values())}/{opts['stock'] * len(ids)}  orders {orders}  "
+            f"responses {dict(sorted(statuses.items()))}"
+        )
+        return failures
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import fold
+
+
+class Command(BaseCommand):
+    help = "Fold sharded orders_count increments (PRODUCT_COUNTER_SHARDS) into Product.orders_count."
+
+    def handle(self, *args, **opts):
+        folded = fold(log=lambda products, count: self.stdout.write(f"{count} increments over {products} products"))
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} increments"))
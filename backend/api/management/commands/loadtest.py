@@ -0,0 +1,79 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with concurrent keep-alive clients and report requests/sec. "
+        "Run it once against a WSGI deployment and once against the ASGI one with the same worker count."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="Full URLs, e.g. http://127.0.0.1:4000/api/stores/by-slug/demo")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per URL")
+        parser.add_argument("--timeout", type=float, default=10.0)
+
+    def handle(self, *args, **opts):
+        for url in opts["urls"]:
+            self._run(url, opts["concurrency"], opts["duration"], opts["timeout"])
+
+    def _run(self, url, concurrency, duration, timeout):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise CommandError(f"Unsupported URL: {url}")
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            conn = conn_cls(parts.netloc, timeout=timeout)
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", target)
+                    resp = conn.getresponse()
+                    resp.read()
+                    if resp.status >= 400:
+                        failed += 1
+                    local.append(time.perf_counter() - start)
+                except Exception:
+                    failed += 1
+                    conn.close()
+                    conn = conn_cls(parts.netloc, timeout=timeout)
+            conn.close()
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        self.stdout.write(
+            f"{url}\n"
+            f"  requests {len(latencies)}  errors {errors[0]}  {len(latencies) / elapsed:.1f} req/s\n"
+            f"  latency p50 {_percentile(latencies, 50) * 1000:.1f} ms  "
+            f"p95 {_percentile(latencies, 95) * 1000:.1f} ms  p99 {_percentile(latencies, 99) * 1000:.1f} ms"
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.popularity import refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute Store.popularity from product orders_count and recent daily sales rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--store", action="append", dest="stores", help="Limit to a store id (repeatable)")
+
+    def handle(self, *args, **opts):
+        updated = refresh(store_ids=opts["stores"], batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed popularity of {updated} stores"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.search import reindex
+
+
+class Command(BaseCommand):
+    help = "Recompute the search tokens used by products/search for every Product."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        processed = reindex(
+            batch_size=opts["batch_size"],
+            log=lambda n: self.stdout.write(f"  {n} products processed"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {processed} products"))
@@ -1,4 +1,6 @@
 from datetime import datetime
+
+from django.conf import settings
 from mongoengine import (
     Document,
     EmbeddedDocument,
@@ -23,6 +25,9 @@ from mongoengine import (
     BooleanField,
     ListField,
     IntField,
+    Decimal128Field,
+    DictField,
+    FloatField,
 )
 
 
@@ -38,6 +43,9 @@ class User(Document):
     stores = MapField(StringField())  # {storeName: storeId}
     created_at = DateTimeField(default=datetime.utcnow)
 
+    # Lets DRF treat a User document as request.user
+    is_authenticated = True
+
     def __str__(self):
         return self.email
 
@@ -47,6 +55,13 @@ class Project(Document):
     name = StringField(required=True, max_length=200)
     created_at = DateTimeField(default=datetime.utcnow)
 
+    meta = {
+        "indexes": [
+            {"fields": ["owner", "-created_at"]},  # projects/mine
+            {"fields": ["-created_at"]},  # ProjectViewSet list
+        ],
+    }
+
     def __str__(self):
         return self.name
 
@@ -68,22 +83,83 @@ class Store(Document):
     # Logo assets
     logo_url = StringField()
     logo_alt = StringField()
+    logo_variants = DictField()  # resized copies of logo_url, see api/images.py
         # nav_items removed as part of the patch
+    popularity = FloatField(default=0)  # maintained by api/popularity.py
     created_at = DateTimeField(default=datetime.utcnow)
 
+    meta = {
+        "indexes": [
+            {"fields": ["-created_at"]},  # StoreViewSet list
+            {"fields": ["-popularity", "-id"]},  # stores/directory
+            {"fields": ["store_type", "-popularity", "-id"]},  # stores/directory?store_type=
+        ],
+    }
+
     def __str__(self):
         return self.name
 
 
+class OrderItem(EmbeddedDocument):
+    """One cart line of an orders/checkout order, priced when the order was placed."""
+
+    product = ReferenceField("Product")
+    name = StringField()
+    quantity = IntField(min_value=1, default=1)
+    unit_price = DecimalField(precision=2, force_string=True)
+
+
 class Order(Document):
     store = ReferenceField(Store, reverse_delete_rule=2)  # CASCADE
     total = DecimalField(precision=2, force_string=True)
+    items = ListField(EmbeddedDocumentField(OrderItem))  # empty for single-product buys
     created_at = DateTimeField(default=datetime.utcnow)
 
+    meta = {
+        "indexes": [
+            # per-store history, rollup backfill; _id for the order of the export stream
+            {"fields": ["store", "created_at", "id"]},
+            {"fields": ["-created_at"]},  # OrderViewSet list
+        ],
+    }
+
     def __str__(self):
         return f"Order #{str(self.id)} - {self.total}"
 
 
+class SalesRollup(Document):
+    """Pre-aggregated order count and revenue per store and time bucket."""
+
+    store = ReferenceField(Store, reverse_delete_rule=2)
+    granularity = StringField(required=True, choices=("hour", "day"))
+    bucket = DateTimeField(required=True)  # UTC start of the hour/day
+    orders = IntField(default=0)
+    revenue = Decimal128Field(precision=2, default=0)
+
+    meta = {
+        "indexes": [
+            {"fields": ["store", "granularity", "bucket"], "unique": True},
+        ],
+    }
+
+
+class IdempotencyRecord(Document):
+    """Outcome of a write sent with an Idempotency-Key, replayed on retries (api/idempotency.py)."""
+
+    key = StringField(primary_key=True)  # "<scope>:<user id or ->:<header value>"
+    fingerprint = StringField(required=True)  # hash of method, path and body
+    state = StringField(choices=("pending", "done"), default="pending")
+    status_code = IntField()
+    body = StringField()  # rendered JSON
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        "indexes": [
+            {"fields": ["created_at"], "expireAfterSeconds": getattr(settings, "IDEMPOTENCY_TTL", 24 * 60 * 60)},
+        ],
+    }
+
+
 class NavItem(EmbeddedDocument):
     name = StringField()
     link = StringField()
@@ -97,10 +173,46 @@ class Product(Document):
     description = StringField()
     images = ListField(StringField())
     image_alts = ListField(StringField())
+    image_variants = ListField(DictField())  # {"original": url, "thumb": {...}, ...}
     old_price = DecimalField(precision=2, force_string=True)
     current_price = DecimalField(precision=2, force_string=True)
     orders_count = IntField(default=0)
+    stock = IntField(min_value=0)  # units left, None = unlimited (api/inventory.py)
+    # Search terms derived from name/description in clean(), see api/search.py
+    name_tokens = ListField(StringField())
+    search_tokens = ListField(StringField())
     created_at = DateTimeField(default=datetime.utcnow)
 
+    meta = {
+        "indexes": [
+            {"fields": ["store", "-created_at", "-id"]},  # products/by-slug keyset, dashboard aggregation
+            {"fields": ["search_tokens"]},  # products/search
+            {"fields": ["store", "search_tokens"]},  # products/search scoped to a store
+        ],
+    }
+
+    def clean(self):
+        from .search import tokenize
+
+        self.name_tokens = tokenize(self.name)
+        self.search_tokens = tokenize(self.name, self.description)
+
     def __str__(self):
         return self.name
+
+
+class ProductCounterShard(Document):
+    """Part of a product's orders_count not yet folded into it (PRODUCT_COUNTER_SHARDS, api/counters.py)."""
+
+    product = ReferenceField(Product, reverse_delete_rule=2)
+    store = ReferenceField(Store, reverse_delete_rule=2)
+    shard = IntField(required=True)
+    count = IntField(default=0)
+
+    meta = {
+        "indexes": [
+            {"fields": ["product", "shard"], "unique": True},  # increments, products/by-slug sums
+            {"fields": ["store"]},  # dashboard sums
+            {"fields": ["count"]},  # folder: shards with something to fold
+        ],
+    }
@@ -0,0 +1,133 @@
+import atexit
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from pymongo.errors import BulkWriteError
+
+from .events import publish_orders
+from .models import Order
+from .popularity import apply_orders as bump_popularity
+from .rollups import apply_orders
+
+logger = logging.getLogger(__name__)
+
+
+class OrderWriteBuffer:
+    """Bounded in-process write-behind buffer for Order inserts.
+
+    Orders are queued in memory and written with a single ``insert_many``
+    (plus one bulk rollup update) either when the buffer reaches ``max_size``
+    or every ``flush_interval`` seconds, whichever comes first. A full buffer
+    is flushed on the caller's thread so memory stays bounded under load.
+
+    A batch leaves the buffer only once ``insert_many`` has succeeded; when
+    it fails the orders stay queued and the next flush sends them again.
+    """
+
+    def __init__(self, max_size=500, flush_interval=1.0):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, order: Order):
+        self._ensure_worker()
+        with self._lock:
+            self._pending.append(order.to_mongo().to_dict())
+            full = len(self._pending) >= self.max_size
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                # The order is queued, the background flush retries it
+                logger.exception("Order buffer flush failed, %d orders kept for the next one", len(self))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            _insert_orders(batch)
+            with self._lock:
+                # Only flush() removes orders, and add() appends: the batch is still at the front
+                for _ in batch:
+                    self._pending.popleft()
+            apply_orders(batch)
+            bump_popularity(batch)
+            return len(batch)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-write-buffer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Order buffer flush failed, %d orders kept for the next one", len(self))
+
+
+def _insert_orders(docs):
+    """``insert_many`` that can be repeated with the same documents.
+
+    ``insert_many`` sets ``_id`` on the documents, so a retry after a
+    partial failure sends the same ids again: duplicates are the orders
+    written by the earlier attempt and count as done.
+    """
+    try:
+        Order._get_collection().insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])) \
+                or e.details.get("writeConcernErrors"):
+            raise
+
+
+order_buffer = OrderWriteBuffer(
+    max_size=getattr(settings, "ORDER_BUFFER_MAX_SIZE", 500),
+    flush_interval=getattr(settings, "ORDER_BUFFER_FLUSH_INTERVAL", 1.0),
+)
+
+
+def record_order(store_id, total, items=None):
+    """Persist an Order according to ``settings.ORDER_WRITE_MODE``.
+
+    ``"sync"`` inserts immediately (durable once the request returns),
+    ``"buffered"`` hands the order to the write-behind buffer.
+    """
+    return record_orders([Order(store=store_id, total=total or 0, items=items or [])])[0]
+
+
+def record_orders(orders):
+    """``record_order`` for several Orders: one ``insert_many`` and one rollup update in sync mode."""
+    for order in orders:
+        order.validate()
+    docs = [order.to_mongo().to_dict() for order in orders]
+    if getattr(settings, "ORDER_WRITE_MODE", "sync") == "buffered":
+        for order in orders:
+            order_buffer.add(order)
+    else:
+        Order._get_collection().insert_many(docs)
+        for order, doc in zip(orders, docs):
+            order.id = doc["_id"]
+        apply_orders(docs)
+        bump_popularity(docs)
+    publish_orders(docs)
+    return orders
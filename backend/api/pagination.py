@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.queryset.visitor import Q
+
+
+def encode_cursor(value, oid):
+    if isinstance(value, datetime):
+        value = {"$dt": value.isoformat()}
+    raw = json.dumps([value, str(oid)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(value, ObjectId)`` from an opaque cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, oid = json.loads(raw)
+        if isinstance(value, dict) and "$dt" in value:
+            value = datetime.fromisoformat(value["$dt"])
+        return value, ObjectId(oid)
+    except (ValueError, TypeError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+
+def page_limit(raw, default, maximum):
+    try:
+        limit = int(raw) if raw not in (None, "") else default
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+
+def keyset_filter(db_field, cursor):
+    """Raw MongoDB filter selecting documents after ``cursor`` in descending ``(db_field, _id)`` order."""
+    value, oid = decode_cursor(cursor)
+    after = [{db_field: {"$lt": value}}, {db_field: value, "_id": {"$lt": oid}}]
+    if value is not None:
+        after.append({db_field: None})  # missing/null sorts after every value
+    return {"$or": after}
+
+
+def keyset_page(queryset, field, cursor=None, limit=50):
+    """Return ``(documents, next_cursor)`` for ``queryset`` in descending ``(field, id)`` order.
+
+    Descending order on a unique tiebreaker keeps pages stable while new
+    documents are inserted, and each page is a single index range scan no
+    matter how deep the client scrolls. Documents without ``field`` (e.g.
+    stores saved before ``popularity`` existed) come last, as MongoDB sorts
+    them, and are still reached from a cursor on a non-null value.
+    """
+    if cursor:
+        value, oid = decode_cursor(cursor)
+        after = Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": oid})
+        if value is not None:
+            after |= Q(**{field: None})
+        queryset = queryset.filter(after)
+    docs = list(queryset.order_by(f"-{field}", "-id").limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        if isinstance(last, dict):  # as_pymongo() queryset; ``field`` must be its own db_field
+            next_cursor = encode_cursor(last.get(field), last["_id"])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.id)
+    return docs, next_cursor
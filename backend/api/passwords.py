@@ -0,0 +1,134 @@
+"""Password hashing off the request thread.
+
+PBKDF2 is CPU-bound by design, so ``hash_password``/``verify_password``
+run it in a small process pool instead of on the worker serving the
+request. The pool admits at most ``PASSWORD_WORKERS + PASSWORD_QUEUE_SIZE``
+jobs; past that they fail fast with ``PasswordHashingBusy`` (the views
+answer 503 with ``Retry-After``) rather than queueing behind a login burst.
+
+Hashes use Django's ``pbkdf2_sha256$<iterations>$<salt>$<hash>`` format
+with ``PASSWORD_HASH_ITERATIONS`` rounds, so ``django.contrib.auth``
+reads them too; other formats are verified inline by Django.
+"""
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.utils.crypto import get_random_string
+
+ALGORITHM = "pbkdf2_sha256"
+SALT_LENGTH = 22  # same entropy as Django's hashers
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing pool is saturated or did not answer in time."""
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher with ``PASSWORD_HASH_ITERATIONS`` rounds (first in PASSWORD_HASHERS)."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+def _pbkdf2(password, salt, iterations):
+    # Runs in the worker processes: stdlib only
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+    return base64.b64encode(digest).decode("ascii").strip()
+
+
+class HashingPool:
+    """Bounded process pool; sizes left as None are read from settings on first use.
+
+    Reading settings lazily keeps this module importable in the spawned
+    workers, which unpickle ``_pbkdf2`` without configuring Django.
+    """
+
+    def __init__(self, workers=None, queue_size=None, timeout=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def _configure(self):
+        with self._lock:
+            if self._slots is None:
+                if self.workers is None:
+                    self.workers = settings.PASSWORD_WORKERS
+                if self.queue_size is None:
+                    self.queue_size = settings.PASSWORD_QUEUE_SIZE
+                if self.timeout is None:
+                    self.timeout = settings.PASSWORD_HASH_TIMEOUT
+                self._slots = threading.BoundedSemaphore(max(1, self.workers) + self.queue_size)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: children must not inherit the parent's Mongo sockets/threads
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def run(self, fn, *args):
+        if self._slots is None:
+            self._configure()
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise PasswordHashingBusy("Too many password operations in flight")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the job really finishes, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count("rejected")
+            raise PasswordHashingBusy("Password operation timed out")
+        self._count("completed")
+        return result
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        return {"workers": self.workers, "queue_size": self.queue_size, "completed": self.completed, "rejected": self.rejected}
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or settings.PASSWORD_HASH_ITERATIONS
+    salt = get_random_string(SALT_LENGTH)
+    return f"{ALGORITHM}${iterations}${salt}${hashing_pool.run(_pbkdf2, password, salt, iterations)}"
+
+
+def verify_password(password, encoded, setter=None):
+    """Like Django's ``check_password``: calls ``setter(password)`` when the hash uses outdated parameters."""
+    try:
+        algorithm, iterations, salt, expected = (encoded or "").split("$", 3)
+        iterations = int(iterations)
+    except ValueError:
+        algorithm = None
+    if algorithm != ALGORITHM:
+        return check_password(password, encoded, setter)
+    valid = hmac.compare_digest(hashing_pool.run(_pbkdf2, password, salt, iterations).encode(), expected.encode())
+    if valid and setter and iterations != settings.PASSWORD_HASH_ITERATIONS:
+        setter(password)
+    return valid
@@ -0,0 +1,62 @@
+"""Precomputed store popularity for the store directory.
+
+``Store.popularity = lifetime orders + POPULARITY_RECENT_WEIGHT * orders in
+the last POPULARITY_WINDOW_DAYS days``. Lifetime orders are the store's
+summed product ``orders_count``, recent orders come from the daily sales
+rollups. Every recorded order bumps the score by ``1 + weight`` as it
+happens; ``refresh`` recomputes it exactly, which also ages orders out of
+the recent window, so run ``manage.py refresh_popularity`` daily.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import UpdateOne
+
+from .analytics import to_object_ids
+from .models import Product, SalesRollup, Store
+
+
+def recent_weight():
+    return float(getattr(settings, "POPULARITY_RECENT_WEIGHT", 2.0))
+
+
+def apply_orders(orders):
+    """Bump the popularity of the stores of a batch of new Order documents, one $inc per store."""
+    counts = Counter(order.get("store") for order in orders if order.get("store") is not None)
+    step = 1 + recent_weight()
+    ops = [UpdateOne({"_id": store}, {"$inc": {"popularity": count * step}}) for store, count in counts.items()]
+    if ops:
+        Store._get_collection().bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def _sum_by_store(collection, match, field):
+    pipeline = [{"$match": match}, {"$group": {"_id": "$store", "total": {"$sum": f"${field}"}}}]
+    return {row["_id"]: row.get("total") or 0 for row in collection.aggregate(pipeline)}
+
+
+def refresh(store_ids=None, batch_size=1000, now=None):
+    """Recompute ``popularity`` of ``store_ids`` (all stores when empty). Returns the number of stores updated."""
+    scope = {"_id": {"$in": to_object_ids(store_ids)}} if store_ids else {}
+    by_store = {"store": scope["_id"]} if store_ids else {}
+    since = (now or datetime.utcnow()) - timedelta(days=int(getattr(settings, "POPULARITY_WINDOW_DAYS", 7)))
+    lifetime = _sum_by_store(Product._get_collection(), by_store, "orders_count")
+    recent = _sum_by_store(
+        SalesRollup._get_collection(), {**by_store, "granularity": "day", "bucket": {"$gte": since}}, "orders"
+    )
+
+    weight = recent_weight()
+    coll = Store._get_collection()
+    ops, updated = [], 0
+    for doc in coll.find(scope, {"_id": 1}, batch_size=batch_size):
+        score = float(lifetime.get(doc["_id"], 0) + weight * recent.get(doc["_id"], 0))
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"popularity": score}}))
+        if len(ops) >= batch_size:
+            coll.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
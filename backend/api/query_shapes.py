@@ -0,0 +1,68 @@
+"""Query shapes issued by the API, checked by ``manage.py audit_indexes``.
+
+Each entry builds the query the way the view does, using placeholder ids,
+so its plan can be explained without real data. Register new shapes here
+when a view starts filtering or sorting on a new field. Shapes marked
+``streamed`` feed a streaming response and must also avoid an in-memory
+SORT, which would read the whole result before the first row goes out.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from .analytics import store_stats_pipeline
+from .search import search_pipeline
+from .models import Order, Product, ProductCounterShard, Project, SalesRollup, Store, User
+
+_ID = ObjectId()
+
+
+def _find(document, query, sort=None, streamed=False):
+    return {"document": document, "filter": query, "sort": sort, "streamed": streamed}
+
+
+def _aggregate(document, pipeline):
+    return {"document": document, "pipeline": pipeline}
+
+
+QUERY_SHAPES = {
+    "user by email (login/register)": _find(User, {"email": "user@example.com"}),
+    "projects by owner (projects/mine)": _find(Project, {"owner": _ID}, [("created_at", -1)]),
+    "projects list (ProjectViewSet)": _find(Project, {}, [("created_at", -1)]),
+    "store by slug (stores/by-slug)": _find(Store, {"slug": "example"}),
+    "stores by id (auth/me slugs)": _find(Store, {"_id": {"$in": [_ID]}}),
+    "stores list (StoreViewSet)": _find(Store, {}, [("created_at", -1)]),
+    "store directory (stores/directory)": _find(Store, {}, [("popularity", -1), ("_id", -1)]),
+    "store directory by type (stores/directory?store_type=)": _find(
+        Store, {"store_type": "fashion"}, [("popularity", -1), ("_id", -1)]
+    ),
+    "store directory page after cursor": _find(
+        Store,
+        {"store_type": "fashion", "$or": [{"popularity": {"$lt": 1.0}}, {"popularity": 1.0, "_id": {"$lt": _ID}}]},
+        [("popularity", -1), ("_id", -1)],
+    ),
+    "products by store (products/by-slug)": _find(Product, {"store": _ID}, [("created_at", -1), ("_id", -1)]),
+    "products page after cursor (products/by-slug)": _find(
+        Product,
+        {"store": _ID, "$or": [{"created_at": {"$lt": datetime(2000, 1, 1)}}, {"created_at": datetime(2000, 1, 1), "_id": {"$lt": _ID}}]},
+        [("created_at", -1), ("_id", -1)],
+    ),
+    "product search (products/search)": _aggregate(Product, search_pipeline(["red"], "sho")),
+    "product search in a store (products/search?store=)": _aggregate(Product, search_pipeline(["red"], "sho", store_id=_ID)),
+    "product by id (products/buy)": _find(Product, {"_id": _ID}),
+    "cart products (orders/checkout)": _find(Product, {"_id": {"$in": [_ID]}}),
+    "counter shard increment (PRODUCT_COUNTER_SHARDS)": _find(ProductCounterShard, {"product": _ID, "shard": 0}),
+    "unfolded counts of a page (products/by-slug)": _find(ProductCounterShard, {"product": {"$in": [_ID]}}),
+    "unfolded counts of stores (dashboards)": _find(ProductCounterShard, {"store": {"$in": [_ID]}, "count": {"$ne": 0}}),
+    "shards to fold (counter folder)": _find(ProductCounterShard, {"count": {"$gt": 0}}),
+    "orders list (OrderViewSet)": _find(Order, {}, [("created_at", -1)]),
+    "orders by store": _find(Order, {"store": {"$in": [_ID]}}, [("created_at", 1)]),
+    "orders export (stores/<id>/export/orders)": _find(
+        Order, {"store": _ID}, [("created_at", 1), ("_id", 1)], streamed=True
+    ),
+    "products export (stores/<id>/export/products)": _find(
+        Product, {"store": _ID}, [("created_at", -1), ("_id", -1)], streamed=True
+    ),
+    "dashboard store stats": _aggregate(Product, store_stats_pipeline([_ID])),
+    "sales timeseries": _find(SalesRollup, {"store": {"$in": [_ID]}, "granularity": "day", "bucket": {"$gte": datetime(2000, 1, 1)}}),
+}
@@ -0,0 +1,154 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.http.response import HttpResponseBase
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class StorefrontCache:
+    """Cache for the public storefront responses with strong ETags.
+
+    Store responses and the slug -> store id mapping are keyed by slug and
+    deleted on write. Product pages are keyed by store id plus a per-store
+    version token; replacing the token invalidates every cached page of that
+    store at once. Tokens are random rather than counters: a backend that
+    evicts the token (LocMem culls at MAX_ENTRIES) then starts a new one
+    instead of going back to a version whose pages may still be cached.
+    Errors are never cached.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def respond(self, request, key, build):
+        """Serve ``key`` from the cache, calling ``build()`` on a miss.
+
+        ``build`` returns either ``(data, headers)`` to cache, or a Response
+        (e.g. a 404) that is returned as-is.
+        """
+        entry = self.cache.get(key)
+        self._count(hit=entry is not None)
+        if entry is None:
+            result = build()
+            if isinstance(result, Response):
+                return result
+            entry = self._entry(*result)
+            self.cache.set(key, entry)
+
+        if self._not_modified(request, entry):
+            resp = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            resp = Response(entry["data"], status=status.HTTP_200_OK)
+        return self._with_headers(resp, entry)
+
+    async def arespond(self, request, key, build):
+        """Async ``respond`` for plain Django views; ``build`` is a coroutine function
+        returning ``(data, headers)`` or an HttpResponse."""
+        entry = await self.cache.aget(key)
+        self._count(hit=entry is not None)
+        if entry is None:
+            result = await build()
+            if isinstance(result, HttpResponseBase):
+                return result
+            entry = self._entry(*result)
+            await self.cache.aset(key, entry)
+
+        if self._not_modified(request, entry):
+            resp = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            resp = HttpResponse(JSONRenderer().render(entry["data"]), content_type="application/json")
+        return self._with_headers(resp, entry)
+
+    def _entry(self, data, headers):
+        body = JSONRenderer().render(data)
+        return {
+            "data": data,
+            "etag": '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+            "headers": headers or {},
+        }
+
+    def _not_modified(self, request, entry):
+        if_none_match = request.headers.get("If-None-Match", "")
+        return entry["etag"] in [tag.strip() for tag in if_none_match.split(",")]
+
+    def _with_headers(self, resp, entry):
+        resp["ETag"] = entry["etag"]
+        for name, value in entry["headers"].items():
+            resp[name] = value
+        return resp
+
+    # Keys
+
+    def store_key(self, slug):
+        return f"storefront:store:{slug}"
+
+    def store_id_key(self, slug):
+        return f"storefront:store-id:{slug}"
+
+    def products_version_key(self, store_id):
+        return f"storefront:products-version:{store_id}"
+
+    def products_version(self, store_id):
+        key = self.products_version_key(store_id)
+        version = self.cache.get(key)
+        if version is None:
+            version = _new_version()
+            if not self.cache.add(key, version, timeout=None):
+                version = self.cache.get(key) or version  # set by a concurrent request
+        return version
+
+    async def aproducts_version(self, store_id):
+        key = self.products_version_key(store_id)
+        version = await self.cache.aget(key)
+        if version is None:
+            version = _new_version()
+            if not await self.cache.aadd(key, version, timeout=None):
+                version = await self.cache.aget(key) or version
+        return version
+
+    def products_key(self, store_id, version, limit, cursor):
+        return f"storefront:products:{store_id}:{version}:{limit}:{cursor or ''}"
+
+    # Invalidation
+
+    def invalidate_store(self, slug):
+        self.cache.delete_many([self.store_key(slug), self.store_id_key(slug)])
+
+    def invalidate_products(self, store_id):
+        self.cache.set(self.products_version_key(store_id), _new_version(), timeout=None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+storefront_cache = StorefrontCache(getattr(settings, "STOREFRONT_CACHE_ALIAS", "storefront"))
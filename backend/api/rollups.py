@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from bson import Decimal128
+from pymongo import UpdateOne
+
+from .analytics import to_object_ids
+from .models import Order, SalesRollup
+
+GRANULARITIES = ("hour", "day")
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _to_decimal(value) -> Decimal:
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    try:
+        return Decimal(str(value or 0))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def rollup_ops(orders):
+    """Collapse raw Order documents into one $inc upsert per (store, granularity, bucket)."""
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for order in orders:
+        store = order.get("store")
+        created_at = order.get("created_at")
+        if store is None or created_at is None:
+            continue
+        amount = _to_decimal(order.get("total"))
+        for granularity in GRANULARITIES:
+            key = (store, granularity, bucket_start(created_at, granularity))
+            totals[key][0] += 1
+            totals[key][1] += amount
+    return [
+        UpdateOne(
+            {"store": store, "granularity": granularity, "bucket": bucket},
+            {"$inc": {"orders": count, "revenue": Decimal128(revenue)}},
+            upsert=True,
+        )
+        for (store, granularity, bucket), (count, revenue) in totals.items()
+    ]
+
+
+def apply_orders(orders):
+    """Fold a batch of Order documents (``to_mongo()`` dicts) into the rollups."""
+    ops = rollup_ops(orders)
+    if ops:
+        SalesRollup._get_collection().bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def backfill(batch_size=5000, store_ids=None, log=None):
+    """Rebuild rollups from the Order collection, streaming it in batches.
+
+    Existing buckets in scope are removed first so the rebuild is idempotent.
+    Returns the number of orders processed.
+    """
+    query = {"store": {"$in": to_object_ids(store_ids)}} if store_ids else {}
+    SalesRollup._get_collection().delete_many(query)
+    cursor = Order._get_collection().find(
+        query, projection={"store": 1, "total": 1, "created_at": 1}, batch_size=batch_size
+    )
+    processed = 0
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            apply_orders(batch)
+            processed += len(batch)
+            batch = []
+            if log:
+                log(processed)
+    if batch:
+        apply_orders(batch)
+        processed += len(batch)
+    return processed
+
+
+def timeseries(store_ids, granularity="day", start=None, end=None):
+    """Return ``[{"bucket", "orders", "revenue"}]`` summed across ``store_ids``, oldest first."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    end = end or datetime.utcnow()
+    start = start or end - (timedelta(hours=48) if granularity == "hour" else timedelta(days=30))
+    pipeline = [
+        {"$match": {
+            "store": {"$in": to_object_ids(store_ids)},
+            "granularity": granularity,
+            "bucket": {"$gte": bucket_start(start, granularity), "$lte": end},
+        }},
+        {"$group": {"_id": "$bucket", "orders": {"$sum": "$orders"}, "revenue": {"$sum": "$revenue"}}},
+        {"$sort": {"_id": 1}},
+    ]
+    return [
+        {
+            "bucket": row["_id"].isoformat() + "Z",
+            "orders": int(row.get("orders") or 0),
+            "revenue": float(_to_decimal(row.get("revenue"))),
+        }
+        for row in SalesRollup._get_collection().aggregate(pipeline)
+    ]
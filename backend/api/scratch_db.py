@@ -0,0 +1,148 @@
+"""Throwaway MongoDB databases for the tests and the ``bench_*`` commands.
+
+``connect_scratch`` connects an alias to a database on a real server, or to
+mongomock when no host is given. mongomock 4.x does not behave like a server
+in three ways this code relies on, and ``patch_mongomock`` fills them in:
+
+- every write becomes atomic: one process-wide lock is held for the whole
+  operation, the way a server applies each update to a document atomically
+  (without it, concurrent conditional updates on one document can all pass);
+- ``bulk_write`` is replayed one operation at a time (mongomock's own
+  implementation does not accept pymongo 4 operations) and ``$inc`` adds
+  ``Decimal128`` values;
+- each operation is reported to ``command_listeners`` like pymongo command
+  monitoring would, so per-request query counts work (see
+  ``api.instrumentation``).
+"""
+import itertools
+import threading
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from bson import Decimal128
+from mongoengine import connect, disconnect
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+# Collection method -> command it stands for
+_COMMANDS = {
+    "find": "find",
+    "find_one": "find",
+    "aggregate": "aggregate",
+    "count_documents": "aggregate",
+    "estimated_document_count": "count",
+    "distinct": "distinct",
+    "insert_one": "insert",
+    "insert_many": "insert",
+    "update_one": "update",
+    "update_many": "update",
+    "replace_one": "update",
+    "delete_one": "delete",
+    "delete_many": "delete",
+    "find_one_and_update": "findAndModify",
+    "find_one_and_replace": "findAndModify",
+    "find_one_and_delete": "findAndModify",
+    "bulk_write": "update",
+}
+_READS = {"find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct"}
+
+command_listeners = []
+
+_write_lock = threading.RLock()
+_local = threading.local()
+_request_ids = itertools.count(1)
+_patched = False
+
+
+def connect_scratch(alias, db, host=None, **options):
+    """Connect ``alias`` to database ``db`` on ``host``, or to mongomock when ``host`` is empty."""
+    disconnect(alias)
+    if host:
+        return connect(alias=alias, db=db, host=host, **options)
+    try:
+        import mongomock
+    except ImportError:
+        raise RuntimeError("mongomock is required without a MongoDB host")
+    patch_mongomock()
+    return connect(alias=alias, db=db, host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+
+
+def patch_mongomock():
+    global _patched
+    if _patched:
+        return
+    import mongomock.collection as mc
+
+    mc.Collection.bulk_write = _bulk_write
+    mc._updaters["$inc"] = _make_inc(mc._updaters["$inc"])
+    for name, command in _COMMANDS.items():
+        setattr(mc.Collection, name, _wrap(getattr(mc.Collection, name), command, name in _READS))
+    _patched = True
+
+
+def _wrap(method, command, read):
+    def wrapper(self, *args, **kwargs):
+        # Operations mongomock implements on top of others count once
+        if getattr(_local, "depth", 0):
+            return method(self, *args, **kwargs)
+        _local.depth = 1
+        event = SimpleNamespace(request_id=next(_request_ids), command_name=command,
+                                command={command: self.name}, duration_micros=0)
+        for listener in command_listeners:
+            listener.started(event)
+        start = time.perf_counter()
+        try:
+            if read:
+                return method(self, *args, **kwargs)
+            with _write_lock:
+                return method(self, *args, **kwargs)
+        finally:
+            _local.depth = 0
+            event.duration_micros = int((time.perf_counter() - start) * 1e6)
+            for listener in command_listeners:
+                listener.succeeded(event)
+
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    counts = dict(inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0)
+    for op in requests:
+        if isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+            counts["inserted_count"] += 1
+            continue
+        if isinstance(op, (UpdateOne, UpdateMany, ReplaceOne)):
+            if isinstance(op, UpdateOne):
+                result = self.update_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, UpdateMany):
+                result = self.update_many(op._filter, op._doc, upsert=op._upsert)
+            else:
+                result = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            counts["matched_count"] += result.matched_count
+            counts["modified_count"] += result.modified_count
+            counts["upserted_count"] += result.upserted_id is not None
+        elif isinstance(op, (DeleteOne, DeleteMany)):
+            delete = self.delete_one if isinstance(op, DeleteOne) else self.delete_many
+            counts["deleted_count"] += delete(op._filter).deleted_count
+        else:
+            raise NotImplementedError(type(op).__name__)
+    return SimpleNamespace(acknowledged=True, **counts)
+
+
+def _make_inc(inc):
+    def inc_decimal(doc, field_name, value):
+        current = doc.get(field_name) if isinstance(doc, dict) else None
+        if isinstance(value, Decimal128) or isinstance(current, Decimal128):
+            doc[field_name] = Decimal128(_decimal(current) + _decimal(value))
+        else:
+            inc(doc, field_name, value)
+
+    return inc_decimal
+
+
+def _decimal(value):
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    return Decimal(value or 0)
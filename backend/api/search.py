@@ -0,0 +1,113 @@
+"""Product search over name and description.
+
+Each Product carries ``name_tokens`` and ``search_tokens`` (name plus
+description), normalised by ``tokenize`` and refreshed by ``Product.clean``
+on every validated save, so create/update/import keep them current. A
+multikey index on ``search_tokens`` serves both exact terms and anchored
+prefix regexes, which makes the last query term match as-you-type.
+"""
+import re
+
+from pymongo import UpdateOne
+
+from .db import read_collection
+from .fast_serializers import product_serializer
+from .models import Product
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MIN_TOKEN_LENGTH = 2
+MAX_TOKENS = 200
+NAME_WEIGHT = 3
+
+
+def tokenize(*texts):
+    """Unique lowercase word tokens of ``texts`` in first-seen order."""
+    seen = {}
+    for text in texts:
+        for token in TOKEN_RE.findall((text or "").casefold()):
+            if len(token) >= MIN_TOKEN_LENGTH and token not in seen:
+                seen[token] = None
+                if len(seen) >= MAX_TOKENS:
+                    return list(seen)
+    return list(seen)
+
+
+def parse_query(q):
+    """Split ``q`` into exact terms and a trailing prefix term (None if the query ends with a space)."""
+    terms = tokenize(q)
+    if not terms:
+        return [], None
+    if q and not q[-1].isspace():
+        return terms[:-1], terms[-1]
+    return terms, None
+
+
+def _term_match(term, prefix):
+    return {"$regex": "^" + re.escape(term)} if prefix else term
+
+
+def search_pipeline(exact, prefix, store_id=None, skip=0, limit=20):
+    clauses = [{"search_tokens": _term_match(t, False)} for t in exact]
+    if prefix:
+        clauses.append({"search_tokens": _term_match(prefix, True)})
+    match = {"$and": clauses}
+    if store_id is not None:
+        match["store"] = store_id
+
+    # One point per term found anywhere, NAME_WEIGHT when found in the name
+    score_terms = []
+    for term, is_prefix in [(t, False) for t in exact] + ([(prefix, True)] if prefix else []):
+        if is_prefix:
+            in_name = {"$gt": [{"$size": {"$filter": {
+                "input": {"$ifNull": ["$name_tokens", []]},
+                "cond": {"$eq": [{"$substrCP": ["$$this", 0, len(term)]}, term]},
+            }}}, 0]}
+        else:
+            in_name = {"$in": [term, {"$ifNull": ["$name_tokens", []]}]}
+        score_terms.append({"$cond": [in_name, NAME_WEIGHT, 1]})
+
+    return [
+        {"$match": match},
+        {"$addFields": {"_score": {"$add": score_terms}}},
+        {"$sort": {"_score": -1, "orders_count": -1, "_id": -1}},
+        {"$skip": skip},
+        {"$limit": limit + 1},
+        {"$project": {**product_serializer.projection, "_score": 1}},
+    ]
+
+
+def search_products(q, store_id=None, page=1, limit=20):
+    """Return ``(results, has_more)``; each result is a serialized product with a ``score``."""
+    exact, prefix = parse_query(q)
+    if not exact and not prefix:
+        return [], False
+    pipeline = search_pipeline(exact, prefix, store_id=store_id, skip=(page - 1) * limit, limit=limit)
+    docs = list(read_collection(Product).aggregate(pipeline))
+    has_more = len(docs) > limit
+    results = []
+    for doc in docs[:limit]:
+        item = product_serializer.to_representation(doc)
+        item["score"] = doc.get("_score", 0)
+        results.append(item)
+    return results, has_more
+
+
+def reindex(batch_size=1000, log=None):
+    """Recompute search tokens of every product, e.g. after upgrading or changing ``tokenize``."""
+    coll = Product._get_collection()
+    ops, processed = [], 0
+    for doc in coll.find({}, {"name": 1, "description": 1}, batch_size=batch_size):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+            "name_tokens": tokenize(doc.get("name")),
+            "search_tokens": tokenize(doc.get("name"), doc.get("description")),
+        }}))
+        if len(ops) >= batch_size:
+            coll.bulk_write(ops, ordered=False)
+            processed += len(ops)
+            ops = []
+            if log:
+                log(processed)
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+        processed += len(ops)
+    return processed
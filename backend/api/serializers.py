@@ -26,6 +26,7 @@ class StoreSerializer(DocumentSerializer):
             "logo_position",
             "logo_url",
             "logo_alt",
+            "logo_variants",
             "created_at",
         )
 
@@ -64,8 +65,10 @@ class ProductSerializer(DocumentSerializer):
             "description",
             "images",
             "image_alts",
+            "image_variants",
             "old_price",
             "current_price",
             "orders_count",
+            "stock",
             "created_at",
         )
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import FileSystemStorage
+from django.views.static import serve
+
+CHUNK_SIZE = 64 * 1024
+# sha256 file names, optionally followed by a variant suffix (see api/images.py)
+HASHED_NAME_RE = re.compile(r"(^|/)[0-9a-f]{64}(-[a-z]+)?\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="media-save")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming each file by the sha256 of its content.
+
+    Uploads are streamed to a temporary file in chunks while being hashed,
+    then atomically renamed to ``<sha256><ext>``. If that file already
+    exists the upload is discarded instead of being written twice. Since a
+    name always maps to the same bytes, URLs can be cached forever.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known after hashing, see _save
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        ext = os.path.splitext(name)[1].lower()
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            hashed_name = os.path.join(os.path.dirname(name), digest.hexdigest() + ext)
+            final_path = self.path(hashed_name)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+            else:
+                # mkstemp creates 0600 files; make them readable like regular uploads
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return hashed_name.replace("\\", "/")
+
+    def save_many(self, files):
+        """Save several uploads in parallel; returns their names in input order."""
+        files = list(files)
+        if len(files) <= 1:
+            return [self.save(f.name, f) for f in files]
+        return list(_executor.map(lambda f: self.save(f.name, f), files))
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """``django.views.static.serve`` adding immutable caching for content-addressed files."""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if HASHED_NAME_RE.search(path):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.test import Client, SimpleTestCase
+from mongoengine.connection import get_db
+
+from api.authentication import token_cache, user_cache
+from api.models import Store, User
+
+
+class MongoTestCase(SimpleTestCase):
+    """Runs on the scratch database of ``shopper.test_settings``, emptied before each test."""
+
+    def setUp(self):
+        db = get_db()
+        for name in db.list_collection_names():
+            if not name.startswith("system."):
+                db[name].delete_many({})  # keeps the indexes MongoEngine created
+        token_cache.clear()
+        user_cache.clear()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.client = Client()
+
+    def make_user(self, email="owner@example.com", **fields):
+        return User(email=email, password="x", **fields).save()
+
+    def make_store(self, owner, slug="shop", **fields):
+        store = Store(owner=owner, name=fields.pop("name", slug.title()), slug=slug, **fields).save()
+        owner.stores = {**(owner.stores or {}), store.name: str(store.id)}
+        owner.save()
+        return store
+
+    def login(self, user, client=None):
+        now = datetime.now(timezone.utc)
+        token = jwt.encode(
+            {"sub": str(user.id), "iat": int(now.timestamp()), "exp": int((now + timedelta(hours=1)).timestamp())},
+            getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY,
+            algorithm="HS256",
+        )
+        (client or self.client).cookies["access_token"] = token
+        return client or self.client
@@ -0,0 +1,82 @@
+import threading
+from unittest import mock
+
+from django.test import Client, override_settings
+from pymongo.errors import AutoReconnect
+
+from api.models import Order, Product
+from api.orders import OrderWriteBuffer, order_buffer
+
+from .base import MongoTestCase
+
+THREADS = 8
+BUYS = 25
+
+
+class ConcurrentPurchaseTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        owner = self.make_user()
+        self.store = self.make_store(owner)
+        self.product = Product(store=self.store, owner=owner, name="Hot", current_price="5.00").save()
+
+    def buy_concurrently(self):
+        statuses = []
+
+        def buyer():
+            client = Client()
+            for _ in range(BUYS):
+                statuses.append(client.post(f"/api/products/buy/{self.product.id}").status_code)
+
+        threads = [threading.Thread(target=buyer) for _ in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return statuses
+
+    def test_sync_mode_counts_every_purchase(self):
+        statuses = self.buy_concurrently()
+
+        self.assertEqual(statuses, [200] * THREADS * BUYS)
+        self.product.reload()
+        self.assertEqual(self.product.orders_count, THREADS * BUYS)
+        self.assertEqual(Order.objects(store=self.store).count(), THREADS * BUYS)
+
+    @override_settings(ORDER_WRITE_MODE="buffered")
+    def test_buffered_mode_writes_every_order_after_flush(self):
+        with mock.patch.object(order_buffer, "max_size", 7):
+            self.buy_concurrently()
+            order_buffer.flush()
+
+        self.product.reload()
+        self.assertEqual(self.product.orders_count, THREADS * BUYS)
+        self.assertEqual(Order.objects(store=self.store).count(), THREADS * BUYS)
+        self.assertEqual(len(order_buffer), 0)
+
+
+class OrderWriteBufferTests(MongoTestCase):
+    def test_failed_insert_keeps_the_batch(self):
+        buffer = OrderWriteBuffer(max_size=100, flush_interval=3600)
+        store = self.make_store(self.make_user())
+        for total in ("1.00", "2.00", "3.00"):
+            buffer.add(Order(store=store.id, total=total))
+
+        insert_many = Order._get_collection().insert_many
+        calls = []
+
+        def fail_after_first(docs, **kwargs):
+            # First order written, then the connection drops
+            calls.append(len(docs))
+            insert_many(docs[:1], **kwargs)
+            raise AutoReconnect("connection lost")
+
+        with mock.patch("pymongo.collection.Collection.insert_many", side_effect=fail_after_first), \
+                mock.patch("mongomock.collection.Collection.insert_many", side_effect=fail_after_first):
+            with self.assertRaises(AutoReconnect):
+                buffer.flush()
+        self.assertEqual(len(buffer), 3)
+
+        self.assertEqual(buffer.flush(), 3)  # the order already written is not duplicated
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(Order.objects(store=store).count(), 3)
@@ -0,0 +1,24 @@
+from api.models import Store
+
+from .base import MongoTestCase
+
+
+class StoreDirectoryTests(MongoTestCase):
+    def test_pages_reach_stores_without_popularity(self):
+        owner = self.make_user()
+        scored = [self.make_store(owner, slug=f"scored-{i}", popularity=float(i % 3)) for i in range(5)]
+        legacy = [self.make_store(owner, slug=f"legacy-{i}") for i in range(4)]
+        # Saved before the field existed
+        Store._get_collection().update_many({"_id": {"$in": [s.id for s in legacy]}}, {"$unset": {"popularity": 1}})
+
+        seen, cursor = [], None
+        while True:
+            response = self.client.get("/api/stores/directory", {"limit": 2, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            seen += [row["slug"] for row in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        self.assertEqual(sorted(seen), sorted(s.slug for s in scored + legacy))
+        self.assertEqual(set(seen[-4:]), {s.slug for s in legacy})
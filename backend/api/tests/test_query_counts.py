@@ -0,0 +1,48 @@
+import re
+
+from django.test import override_settings
+
+from api.models import Product
+
+from .base import MongoTestCase
+
+
+class QueryCountTests(MongoTestCase):
+    """Endpoints that must not issue one query per store or per row."""
+
+    def queries(self, path, client=None):
+        response = (client or self.client).get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+    def owner_with_stores(self, email, count):
+        user = self.make_user(email)
+        for i in range(count):
+            self.make_store(user, slug=f"{email.split('@')[0]}-{i}")
+        return user
+
+    def test_me_is_constant_in_store_count(self):
+        counts = []
+        for email, stores in (("one@example.com", 1), ("many@example.com", 25)):
+            user = self.owner_with_stores(email, stores)
+            response = self.login(user).get("/api/auth/me")
+            self.assertEqual(len(response.json()["stores_slugs"]), stores)
+            counts.append(self.queries("/api/auth/me"))
+        self.assertGreater(counts[0], 0)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_list_views_are_constant_in_row_count(self):
+        owner = self.owner_with_stores("owner@example.com", 2)
+        small, big = owner.stores.values()
+        Product(store=small, owner=owner, name="Only", current_price="1.00").save()
+        for i in range(30):
+            Product(store=big, owner=owner, name=f"P{i}", current_price="1.00").save()
+
+        for fast in (False, True):
+            with self.subTest(fast=fast), override_settings(FAST_SERIALIZATION=fast):
+                self.assertEqual(self.queries("/api/products/by-slug/owner-0?limit=50"),
+                                 self.queries("/api/products/by-slug/owner-1?limit=50"))
+                few = [self.queries("/api/stores/directory"), self.queries("/api/stores/")]
+                for i in range(20):
+                    self.make_store(owner, slug=f"more-{fast}-{i}")
+                self.assertEqual([self.queries("/api/stores/directory"), self.queries("/api/stores/")], few)
@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from api.query_shapes import QUERY_SHAPES
+
+
+class StreamedShapeTests(SimpleTestCase):
+    """Streamed shapes need an index that serves their sort (audit_indexes checks it on a server)."""
+
+    def test_streamed_shapes_sort_through_an_index(self):
+        streamed = {name: shape for name, shape in QUERY_SHAPES.items() if shape.get("streamed")}
+        self.assertIn("orders export (stores/<id>/export/orders)", streamed)
+        for name, shape in streamed.items():
+            with self.subTest(name):
+                equality = [(field, 1) for field, value in shape["filter"].items() if not isinstance(value, dict)]
+                wanted = [field for field, _ in equality] + [field for field, _ in shape["sort"]]
+                directions = [d for _, d in shape["sort"]]
+                matches = []
+                for spec in shape["document"]._meta["index_specs"]:
+                    fields = spec["fields"]
+                    if [f for f, _ in fields[:len(wanted)]] != wanted:
+                        continue
+                    sort_dirs = [d for _, d in fields[len(equality):len(wanted)]]
+                    # An index serves a sort read forwards or backwards
+                    if sort_dirs in (directions, [-d for d in directions]):
+                        matches.append(spec)
+                self.assertTrue(matches, f"no index on {wanted} for {name}")
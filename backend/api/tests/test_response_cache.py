@@ -0,0 +1,39 @@
+from api.models import Product, Store
+from api.response_cache import storefront_cache
+
+from .base import MongoTestCase
+
+
+class StorefrontCacheTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = self.make_user()
+
+    def product_names(self, slug):
+        response = self.client.get(f"/api/products/by-slug/{slug}")
+        self.assertEqual(response.status_code, 200)
+        return [row["name"] for row in response.json()]
+
+    def test_reused_slug_resolves_to_the_new_store(self):
+        old = self.make_store(self.owner, slug="shop")
+        Product(store=old, owner=self.owner, name="Old", current_price="1.00").save()
+        self.assertEqual(self.product_names("shop"), ["Old"])
+
+        self.assertEqual(self.client.delete(f"/api/stores/{old.id}/").status_code, 204)
+        new = Store(owner=self.owner, name="New", slug="shop").save()
+        Product(store=new, owner=self.owner, name="New", current_price="1.00").save()
+
+        self.assertEqual(self.product_names("shop"), ["New"])
+
+    def test_evicted_version_does_not_bring_back_old_pages(self):
+        store = self.make_store(self.owner, slug="shop")
+        self.login(self.owner)
+        Product(store=store, owner=self.owner, name="First", current_price="1.00").save()
+        self.assertEqual(self.product_names("shop"), ["First"])
+        self.client.post("/api/products/create", {"store_id": str(store.id), "name": "Second", "current_price": "1"})
+        self.assertEqual(self.product_names("shop"), ["Second", "First"])
+
+        # What LocMemCache does to some keys once it reaches MAX_ENTRIES
+        storefront_cache.cache.delete(storefront_cache.products_version_key(store.id))
+
+        self.assertEqual(self.product_names("shop"), ["Second", "First"])
@@ -1,6 +1,7 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework_mongoengine.routers import DefaultRouter
-from .views import ProjectViewSet, StoreViewSet, OrderViewSet, health, register, login, me, my_projects, create_store, store_by_slug, create_product, products_by_slug, update_product, buy_product, dashboard_summary, dashboard_breakdown, update_store, update_me
+from . import async_views
+from .views import ProjectViewSet, StoreViewSet, OrderViewSet, health, metrics, db_pool_stats, storefront_cache_stats, image_pipeline_stats, password_pool_stats, register, login, me, my_projects, create_store, store_by_slug, store_directory, create_product, import_products, products_by_slug, search_products, update_product, buy_product, checkout, export_store_data, dashboard_summary, dashboard_stream, dashboard_breakdown, dashboard_timeseries, update_store, update_me
 
 router = DefaultRouter()
 router.register(r"projects", ProjectViewSet)
@@ -9,19 +10,35 @@ router.register(r"orders", OrderViewSet)
 
 urlpatterns = [
     path("health", health),
+    path("metrics", metrics),
+    path("db/pool-stats", db_pool_stats),
+    path("storefront/cache-stats", storefront_cache_stats),
+    path("media/pipeline-stats", image_pipeline_stats),
+    path("auth/pool-stats", password_pool_stats),
     path("auth/register", register),
     path("auth/login", login),
     path("auth/me", me),
     path("projects/mine", my_projects),
     path("stores/create", create_store),
     path("stores/by-slug/<slug>", store_by_slug),
+    path("stores/directory", store_directory),
     path("stores/update/<sid>", update_store),
+    re_path(r"^stores/(?P<sid>[^/]+)/export/(?P<kind>orders|products)$", export_store_data),
     path("products/create", create_product),
+    path("products/import", import_products),
     path("products/by-slug/<slug>", products_by_slug),
+    path("products/search", search_products),
     path("products/update/<pid>", update_product),
     path("products/buy/<pid>", buy_product),
+    path("orders/checkout", checkout),
     path("dashboard/summary", dashboard_summary),
     path("dashboard/breakdown", dashboard_breakdown),
+    path("dashboard/stream", dashboard_stream),
+    path("dashboard/timeseries", dashboard_timeseries),
     path("auth/update", update_me),
+    # Async storefront reads (same responses, for ASGI deployments)
+    path("async/health", async_views.health),
+    path("async/stores/by-slug/<slug>", async_views.store_by_slug),
+    path("async/products/by-slug/<slug>", async_views.products_by_slug),
     path("", include(router.urls)),
 ]
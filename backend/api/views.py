@@ -1,44 +1,144 @@
 from rest_framework_mongoengine.viewsets import ModelViewSet
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth.hashers import make_password, check_password
 from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 try:
     import jwt as pyjwt  # PyJWT expected
 except Exception:
     pyjwt = None
 from .models import Project, Store, Order, User, Product
+from .authentication import invalidate_user
+from .orders import record_order
+from .analytics import dashboard_summary_for, dashboard_breakdown_for, to_object_ids
+from .rollups import timeseries
+from .pagination import keyset_page, page_limit
+from .response_cache import storefront_cache
+from .images import image_pipeline
+from .exports import export_response
+from .instrumentation import metrics as request_metrics
+from .db import for_reads, pool_stats
+from . import counters, events
+from .idempotency import idempotent
+from .inventory import SoldOut, in_stock, parse_stock, purchase
+from .checkout import ProductsNotFound, checkout as checkout_cart, order_payload, parse_items
+from .passwords import PasswordHashingBusy, hash_password, hashing_pool, verify_password
+from .search import search_products as run_product_search
+from .imports import detect_format, iter_rows, import_products as bulk_import_products
 import os
-from django.core.files.storage import FileSystemStorage
+from bson import ObjectId
+from bson.errors import InvalidId
+from .storage import ContentAddressedStorage
 from .serializers import ProjectSerializer, StoreSerializer, OrderSerializer, UserSerializer, ProductSerializer
+from .fast_serializers import order_serializer, product_serializer, project_serializer, store_serializer
 
-class ProjectViewSet(ModelViewSet):
+
+class FastListMixin:
+    """Serve ``list`` from raw documents through ``raw_serializer`` when FAST_SERIALIZATION is on."""
+
+    raw_serializer = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Public lists go to the read alias; lookups backing writes stay on the primary.
+        # References are rendered as ids: dereferencing them costs one query per row.
+        return for_reads(queryset).no_dereference() if self.action == "list" else queryset
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        docs = self.filter_queryset(self.get_queryset()).only(*self.raw_serializer.fields).as_pymongo()
+        return Response(self.raw_serializer.many(docs))
+
+
+class ProjectViewSet(FastListMixin, ModelViewSet):
     lookup_field = "id"
+    authentication_classes = []
+    raw_serializer = project_serializer
     document = Project
     queryset = Project.objects.order_by("-created_at")
     serializer_class = ProjectSerializer
 
-class StoreViewSet(ModelViewSet):
+class StoreViewSet(FastListMixin, ModelViewSet):
     lookup_field = "id"
+    authentication_classes = []
+    raw_serializer = store_serializer
     document = Store
     queryset = Store.objects.order_by("-created_at")
     serializer_class = StoreSerializer
 
-class OrderViewSet(ModelViewSet):
+    def perform_update(self, serializer):
+        old_slug = serializer.instance.slug
+        super().perform_update(serializer)
+        storefront_cache.invalidate_store(old_slug)
+        storefront_cache.invalidate_store(serializer.instance.slug)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # The slug may be taken by another store next
+        storefront_cache.invalidate_store(instance.slug)
+        storefront_cache.invalidate_products(instance.id)
+
+class OrderViewSet(FastListMixin, ModelViewSet):
     lookup_field = "id"
+    authentication_classes = []
+    raw_serializer = order_serializer
     document = Order
     queryset = Order.objects.order_by("-created_at")
     serializer_class = OrderSerializer
 
 @api_view(["GET"])
+@authentication_classes([])
 def health(_request):
     return Response({"status": "ok"})
 
 
+@api_view(["GET"])
+@authentication_classes([])
+def storefront_cache_stats(_request):
+    return Response(storefront_cache.stats(), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@authentication_classes([])
+def image_pipeline_stats(_request):
+    return Response(image_pipeline.stats(), status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    # Plain Django view: Prometheus expects text/plain, not DRF content negotiation
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(request_metrics.render() + pool_stats.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@api_view(["GET"])
+@authentication_classes([])
+def db_pool_stats(_request):
+    return Response(pool_stats.stats())
+
+
+@api_view(["GET"])
+@authentication_classes([])
+def password_pool_stats(_request):
+    return Response(hashing_pool.stats())
+
+
+def _busy():
+    return Response(
+        {"detail": "Too many sign-ins right now, please retry"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
+
+
 @api_view(["POST"])
+@authentication_classes([])
 @permission_classes([AllowAny])
 def register(request):
     data = request.data or {}
@@ -57,10 +157,15 @@ def register(request):
     if User.objects(email=email).first():
         return Response({"detail": "Email already registered"}, status=status.HTTP_409_CONFLICT)
 
+    try:
+        hashed = hash_password(password)
+    except PasswordHashingBusy:
+        return _busy()
+
     try:
         user = User(
             email=email,
-            password=make_password(password),
+            password=hashed,
             name=name,
             first_name=first_name,
             last_name=last_name,
@@ -77,6 +182,7 @@ def register(request):
 
 
 @api_view(["POST"])
+@authentication_classes([])  # a stale cookie must not block logging in again
 @permission_classes([AllowAny])
 def login(request):
     data = request.data or {}
@@ -90,8 +196,19 @@ def login(request):
     if not user:
         return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    if not check_password(password, user.password):
-        return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+    def rehash(raw):
+        # Stored with outdated parameters: upgrade it now that we know the password
+        try:
+            User.objects(id=user.id).update_one(set__password=hash_password(raw))
+        except PasswordHashingBusy:
+            return  # keep the old hash, retry on a later login
+        invalidate_user(user.id)
+
+    try:
+        if not verify_password(password, user.password, setter=rehash):
+            return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+    except PasswordHashingBusy:
+        return _busy()
 
     # Build JWT payload
     now = datetime.now(timezone.utc)
@@ -132,84 +249,61 @@ def login(request):
     return resp
 
 
-@api_view(["GET"])
-@permission_classes([AllowAny])
-def me(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
-        return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    if pyjwt is None or not hasattr(pyjwt, "decode"):
-        return Response({
-            "detail": "JWT library not available. Ensure PyJWT is installed and conflicting 'jwt' package is uninstalled."
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-
-    user_id = payload.get("sub")
-    user = None
-    try:
-        user = User.objects(id=user_id).first()
-    except Exception:
-        user = None
-
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-
-    name = user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
-    # Build store slugs map from user's stores
-    stores_slugs = {}
-    try:
-        for sname, sid in (user.stores or {}).items():
-            try:
-                sdoc = Store.objects(id=sid).first()
-                if sdoc:
-                    stores_slugs[sname] = sdoc.slug
-            except Exception:
-                continue
-    except Exception:
-        stores_slugs = {}
-
-    return Response({
+def _save_uploads(request, files, folder):
+    """Store uploads under MEDIA_ROOT/<folder> by content hash; returns ``[(path, url)]``."""
+    if not files:
+        return []
+    storage = ContentAddressedStorage(
+        location=os.path.join(settings.MEDIA_ROOT, folder),
+        base_url=f"{settings.MEDIA_URL}{folder}/",
+    )
+    saved = []
+    for saved_name in storage.save_many(files):
+        try:
+            url = request.build_absolute_uri(storage.url(saved_name))
+        except Exception:
+            url = storage.url(saved_name)
+        saved.append((storage.path(saved_name), url))
+    return saved
+
+
+def _me_payload(user):
+    # Resolve every store slug with one $in query instead of one lookup per store
+    store_ids = user.stores or {}
+    slugs = {}
+    if store_ids:
+        slugs = {
+            str(sdoc["_id"]): sdoc.get("slug")
+            for sdoc in Store.objects(id__in=to_object_ids(store_ids.values())).only("id", "slug").as_pymongo()
+        }
+    stores_slugs = {sname: slugs[str(sid)] for sname, sid in store_ids.items() if str(sid) in slugs}
+    return {
         "id": str(user.id),
         "email": user.email,
         "role": user.role or "client",
-        "name": name,
+        "name": user.name or f"{user.first_name or ''} {user.last_name or ''}".strip(),
         "plan": user.plan or "none",
-        "stores": user.stores or {},
+        "stores": store_ids,
         "stores_slugs": stores_slugs,
-    }, status=status.HTTP_200_OK)
+    }
 
 
-@api_view(["POST"])
-def create_store(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def me(request):
+    user = request.user
+    if not user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    if pyjwt is None or not hasattr(pyjwt, "decode"):
-        return Response({
-            "detail": "JWT library not available. Ensure PyJWT is installed and conflicting 'jwt' package is uninstalled."
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response(_me_payload(user), status=status.HTTP_200_OK)
 
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    user_id = payload.get("sub")
-    user = None
-    try:
-        user = User.objects(id=user_id).first()
-    except Exception:
-        user = None
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+@api_view(["POST"])
+@idempotent("create_store")
+def create_store(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
     data = request.data or {}
     name = (data.get("name") or "").strip()
@@ -236,32 +330,28 @@ def create_store(request):
             logo_position=(data.get("logo_position") or "left"),
         )
         # Handle optional logo upload (multipart/form-data)
+        logo_path = None
         try:
             logo_file = request.FILES.get("logo")
         except Exception:
             logo_file = None
         if logo_file:
-            logos_dir = os.path.join(settings.MEDIA_ROOT, "logos")
-            os.makedirs(logos_dir, exist_ok=True)
-            # Use slug for filename to keep it deterministic
-            _, ext = os.path.splitext(logo_file.name)
-            filename = f"{slug}{ext or ''}"
-            storage = FileSystemStorage(location=logos_dir, base_url=settings.MEDIA_URL + "logos/")
-            saved_name = storage.save(filename, logo_file)
-            try:
-                store.logo_url = request.build_absolute_uri(storage.url(saved_name))
-            except Exception:
-                store.logo_url = storage.url(saved_name)
+            [(logo_path, store.logo_url)] = _save_uploads(request, [logo_file], "logos")
             alt = data.get("logo_alt") or None
             if alt:
                 store.logo_alt = alt
 
         store.save()
+        storefront_cache.invalidate_store(store.slug)
+        if logo_path:
+            image_pipeline.store_logo(store.id, store.slug, logo_path, store.logo_url)
         # Update user's stores mapping
         stores_map = user.stores or {}
         stores_map[name] = str(store.id)
         user.stores = stores_map
         user.save()
+        invalidate_user(user.id)
+        events.publish_store(user.id, store)
         return Response({
             "id": str(store.id),
             "name": store.name,
@@ -283,73 +373,72 @@ def create_store(request):
 
 @api_view(["GET"])
 def my_projects(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
+    user = request.user
+    if not user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    if pyjwt is None or not hasattr(pyjwt, "decode"):
-        return Response({
-            "detail": "JWT library not available. Ensure PyJWT is installed and conflicting 'jwt' package is uninstalled."
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-
-    user_id = payload.get("sub")
-    user = None
-    try:
-        user = User.objects(id=user_id).first()
-    except Exception:
-        user = None
-
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-
     projects = Project.objects(owner=user).order_by("-created_at")
     data = ProjectSerializer(projects, many=True).data
     return Response(data, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
-def store_by_slug(_request, slug: str):
-    store = Store.objects(slug=slug).first()
-    if not store:
-        return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
-    data = StoreSerializer(store).data
-    owner = store.owner
-    data["owner_info"] = {
-        "id": str(owner.id) if owner else None,
-        "name": owner.name if owner else None,
-        "email": owner.email if owner else None,
-        "phone": owner.phone if owner else None,
-    }
-    return Response(data, status=status.HTTP_200_OK)
+@authentication_classes([])
+def store_by_slug(request, slug: str):
+    def build():
+        store = for_reads(Store.objects(slug=slug)).no_dereference().first()
+        if not store:
+            return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
+        data = StoreSerializer(store).data
+        owner = None
+        if store.owner:
+            owner = for_reads(User.objects(id=store.owner.id)).only("id", "name", "email", "phone").first()
+        data["owner_info"] = {
+            "id": str(owner.id) if owner else None,
+            "name": owner.name if owner else None,
+            "email": owner.email if owner else None,
+            "phone": owner.phone if owner else None,
+        }
+        return data, {}
+
+    return storefront_cache.respond(request, storefront_cache.store_key(slug), build)
+
+
+@api_view(["GET"])
+@authentication_classes([])
+def store_directory(request):
+    try:
+        limit = page_limit(request.query_params.get("limit"), settings.STORES_PAGE_SIZE, settings.STORES_PAGE_SIZE_MAX)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    stores = for_reads(Store.objects.only(*StoreSerializer.Meta.fields, "popularity")).no_dereference()
+    store_type = request.query_params.get("store_type")
+    if store_type:
+        stores = stores.filter(store_type=store_type)
+    if settings.FAST_SERIALIZATION:
+        stores = stores.as_pymongo()
+    try:
+        stores, next_cursor = keyset_page(stores, "popularity", request.query_params.get("cursor"), limit)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if settings.FAST_SERIALIZATION:
+        data = store_serializer.many(stores)
+        popularity = [doc.get("popularity") or 0.0 for doc in stores]
+    else:
+        data = StoreSerializer(stores, many=True).data
+        popularity = [store.popularity for store in stores]
+    for row, score in zip(data, popularity):
+        row["popularity"] = score
+    return Response(data, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
 
 @api_view(["POST"])
+@idempotent("create_product")
 def create_product(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
+    user = request.user
+    if not user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    if pyjwt is None or not hasattr(pyjwt, "decode"):
-        return Response({
-            "detail": "JWT library not available. Ensure PyJWT is installed and conflicting 'jwt' package is uninstalled."
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-
-    user = User.objects(id=payload.get("sub")).first()
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-
     data = request.data or {}
     store_id = data.get("store_id")
     store = None
@@ -366,23 +455,18 @@ def create_product(request):
 
     images = []
     image_alts = []
+    saved_files = []  # (path, url) of originals, for image_pipeline
     try:
-        files = request.FILES.getlist("images")
-        for f in files:
-            imgs_dir = os.path.join(settings.MEDIA_ROOT, "products")
-            os.makedirs(imgs_dir, exist_ok=True)
-            _, ext = os.path.splitext(f.name)
-            filename = f"{store.slug}-{name.replace(' ', '-')}-{datetime.now().timestamp()}{ext or ''}"
-            storage = FileSystemStorage(location=imgs_dir, base_url=settings.MEDIA_URL + "products/")
-            saved_name = storage.save(filename, f)
-            try:
-                images.append(request.build_absolute_uri(storage.url(saved_name)))
-            except Exception:
-                images.append(storage.url(saved_name))
+        saved_files = _save_uploads(request, request.FILES.getlist("images"), "products")
+        images = [url for _, url in saved_files]
     except Exception:
         pass
     if isinstance(data.get("image_alts"), list):
         image_alts = data.get("image_alts")
+    try:
+        stock = parse_stock(data.get("stock"))
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
         product = Product(
@@ -394,20 +478,114 @@ def create_product(request):
             image_alts=image_alts,
             old_price=data.get("old_price") or None,
             current_price=data.get("current_price") or None,
+            stock=stock,
         )
         product.save()
+        storefront_cache.invalidate_products(store.id)
+        image_pipeline.product_images(product.id, store.id, saved_files)
+        events.publish_products(store.id, 1)
         return Response(ProductSerializer(product).data, status=status.HTTP_201_CREATED)
     except Exception as e:
         return Response({"detail": f"Failed to create product: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(["GET"])
-def products_by_slug(_request, slug: str):
-    store = Store.objects(slug=slug).first()
+@api_view(["POST"])
+def import_products(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = request.data or {}
+    store = None
+    if data.get("store_id"):
+        store = Store.objects(id=data.get("store_id")).only("id", "owner").no_dereference().first()
+    if not store and data.get("slug"):
+        store = Store.objects(slug=data.get("slug")).only("id", "owner").no_dereference().first()
     if not store:
         return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
-    products = Product.objects(store=store).order_by("-created_at")
-    return Response(ProductSerializer(products, many=True).data, status=status.HTTP_200_OK)
+    if not store.owner or str(store.owner.id) != str(user.id):
+        return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+    upload = request.FILES.get("file")
+    if not upload:
+        return Response({"detail": "A CSV or NDJSON file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    fmt = detect_format(upload, data.get("format"))
+    report = bulk_import_products(
+        iter_rows(upload, fmt), store.id, user.id, batch_size=settings.PRODUCT_IMPORT_BATCH_SIZE
+    )
+    if report["inserted"]:
+        storefront_cache.invalidate_products(store.id)
+        events.publish_products(store.id, report["inserted"])
+    report["format"] = fmt
+    return Response(report, status=status.HTTP_201_CREATED if report["inserted"] else status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["GET"])
+@authentication_classes([])
+def products_by_slug(request, slug: str):
+    store_id = storefront_cache.cache.get(storefront_cache.store_id_key(slug))
+    if store_id is None:
+        store = for_reads(Store.objects(slug=slug)).only("id").first()
+        if not store:
+            return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
+        store_id = str(store.id)
+        storefront_cache.cache.set(storefront_cache.store_id_key(slug), store_id)
+    try:
+        limit = page_limit(request.query_params.get("limit"), settings.PRODUCTS_PAGE_SIZE, settings.PRODUCTS_PAGE_SIZE_MAX)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    cursor = request.query_params.get("cursor")
+
+    def build():
+        try:
+            # Project to the serialized fields and keep store/owner as raw references
+            products = for_reads(Product.objects(store=store_id)).only(*ProductSerializer.Meta.fields).no_dereference()
+            if settings.FAST_SERIALIZATION:
+                products = products.as_pymongo()
+            products, next_cursor = keyset_page(products, "created_at", cursor, limit)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if settings.FAST_SERIALIZATION:
+            data = product_serializer.many(products)
+        else:
+            data = ProductSerializer(products, many=True).data
+        if counters.enabled():
+            data = counters.add_pending([dict(row) for row in data])
+        return data, ({"X-Next-Cursor": next_cursor} if next_cursor else {})
+
+    key = storefront_cache.products_key(store_id, storefront_cache.products_version(store_id), limit, cursor)
+    return storefront_cache.respond(request, key, build)
+
+
+@api_view(["GET"])
+@authentication_classes([])
+def search_products(request):
+    q = request.query_params.get("q") or ""  # a trailing space ends the prefix term, keep it
+    if not q.strip():
+        return Response({"detail": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = page_limit(request.query_params.get("limit"), settings.SEARCH_PAGE_SIZE, settings.SEARCH_PAGE_SIZE_MAX)
+        page = int(request.query_params.get("page") or 1)
+    except ValueError:
+        return Response({"detail": "page and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if page < 1 or page * limit > settings.SEARCH_MAX_RESULTS:
+        return Response({"detail": "page out of range"}, status=status.HTTP_400_BAD_REQUEST)
+
+    store_id = None
+    slug = request.query_params.get("store")
+    if slug:
+        store_id = storefront_cache.cache.get(storefront_cache.store_id_key(slug))
+        if store_id is None:
+            store = for_reads(Store.objects(slug=slug)).only("id").first()
+            if not store:
+                return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
+            store_id = str(store.id)
+            storefront_cache.cache.set(storefront_cache.store_id_key(slug), store_id)
+        store_id = ObjectId(store_id)
+
+    results, has_more = run_product_search(q, store_id=store_id, page=page, limit=limit)
+    return Response({"results": results, "page": page, "has_more": has_more})
 
 
 @api_view(["PATCH", "PUT"])
@@ -416,15 +594,9 @@ def update_product(request, pid: str):
     if not product:
         return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    token = request.COOKIES.get("access_token")
-    if not token:
+    if not request.user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-    if str(product.owner.id) != payload.get("sub"):
+    if str(product.owner.id) != str(request.user.id):
         return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
     data = request.data or {}
@@ -435,193 +607,194 @@ def update_product(request, pid: str):
     for field in ("old_price", "current_price"):
         if field in data:
             setattr(product, field, data.get(field) or None)
+    if "stock" in data:
+        # Sets the count outright: units sold while the owner was editing are not subtracted
+        try:
+            product.stock = parse_stock(data.get("stock"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    saved_files = []  # (path, url) of originals, for image_pipeline
     try:
-        files = request.FILES.getlist("images")
-        if files:
-            imgs_dir = os.path.join(settings.MEDIA_ROOT, "products")
-            os.makedirs(imgs_dir, exist_ok=True)
-            storage = FileSystemStorage(location=imgs_dir, base_url=settings.MEDIA_URL + "products/")
-            for f in files:
-                _, ext = os.path.splitext(f.name)
-                filename = f"{product.store.slug}-{product.name.replace(' ', '-')}-{datetime.now().timestamp()}{ext or ''}"
-                saved_name = storage.save(filename, f)
-                try:
-                    product.images.append(request.build_absolute_uri(storage.url(saved_name)))
-                except Exception:
-                    product.images.append(storage.url(saved_name))
+        saved_files = _save_uploads(request, request.FILES.getlist("images"), "products")
+        product.images.extend(url for _, url in saved_files)
     except Exception:
         pass
     if isinstance(data.get("image_alts"), list):
         product.image_alts = data.get("image_alts")
 
     product.save()
+    storefront_cache.invalidate_products(product.store.id)
+    image_pipeline.product_images(product.id, product.store.id, saved_files)
     return Response(ProductSerializer(product).data, status=status.HTTP_200_OK)
 
 
 @api_view(["POST"])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@idempotent("buy_product")
 def buy_product(_request, pid: str):
-    product = Product.objects(id=pid).first()
+    try:
+        oid = ObjectId(pid)
+    except (InvalidId, TypeError):
+        return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+    # Single atomic update, taking stock only if a unit is left; returns the product as it was
+    product = purchase(oid, projection={"store": 1, "current_price": 1})
     if not product:
         return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
-    product.orders_count = int(product.orders_count or 0) + 1
-    product.save()
+    if not in_stock(product, 1):
+        return Response({"detail": "Sold out", "stock": product.get("stock")}, status=status.HTTP_409_CONFLICT)
     try:
-        total = product.current_price or 0
-        Order(store=product.store, total=total).save()
+        record_order(product.get("store"), product.get("current_price"))
     except Exception:
         pass
-    return Response({"orders_count": product.orders_count}, status=status.HTTP_200_OK)
+    storefront_cache.invalidate_products(product.get("store"))
+    stock = product.get("stock")
+    return Response(
+        {"orders_count": (product.get("orders_count") or 0) + 1, "stock": None if stock is None else stock - 1},
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@idempotent("checkout")
+def checkout(request):
+    try:
+        quantities = parse_items(request.data.get("items"))
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        orders = checkout_cart(quantities)
+    except ProductsNotFound as e:
+        return Response({"detail": "Product not found", "products": e.ids}, status=status.HTTP_404_NOT_FOUND)
+    except SoldOut as e:
+        return Response({"detail": "Sold out", "products": e.ids}, status=status.HTTP_409_CONFLICT)
+    payload = [order_payload(order) for order in orders]
+    for order in payload:
+        storefront_cache.invalidate_products(order["store"])
+    total = sum((Decimal(order["total"]) for order in payload), Decimal(0))
+    return Response({"orders": payload, "total": f"{total:.2f}"}, status=status.HTTP_201_CREATED)
 
 
 @api_view(["GET"])
-def dashboard_summary(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
+def export_store_data(request, sid: str, kind: str):
+    if not request.user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+    store = Store.objects(id=sid).only("id", "owner").no_dereference().first() if ObjectId.is_valid(sid) else None
+    if not store:
+        return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
+    if not store.owner or str(store.owner.id) != str(request.user.id):
+        return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
+    # "format" is reserved by DRF for renderer selection
+    fmt = (request.query_params.get("fmt") or "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return Response({"detail": "fmt must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
+        batch_size = page_limit(request.query_params.get("batch_size"), settings.EXPORT_BATCH_SIZE, 10000)
+    except ValueError:
+        return Response({"detail": "batch_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    return export_response(kind, store.id, fmt, batch_size)
 
-    user = User.objects(id=payload.get("sub")).first()
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(["GET"])
+def dashboard_summary(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
     store_ids = list((user.stores or {}).values())
-    total_stores = len(store_ids)
-    total_products = 0
-    total_orders = 0
-    total_revenue = 0
-    for sid in store_ids:
-        try:
-            sdoc = Store.objects(id=sid).first()
-            if not sdoc:
-                continue
-            prods = Product.objects(store=sdoc)
-            total_products += prods.count()
-            for p in prods:
-                total_orders += int(p.orders_count or 0)
-                try:
-                    total_revenue += float(p.current_price or 0) * int(p.orders_count or 0)
-                except Exception:
-                    continue
-        except Exception:
-            continue
+    return Response(dashboard_summary_for(store_ids), status=status.HTTP_200_OK)
 
-    return Response({
-        "totalStores": total_stores,
-        "totalProducts": total_products,
-        "totalOrders": total_orders,
-        "totalRevenue": total_revenue,
-    }, status=status.HTTP_200_OK)
+
+@api_view(["GET"])
+def dashboard_stream(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    store_ids = list((user.stores or {}).values())
+    # Subscribe before the snapshot is computed so no delta falls in between
+    subscription = events.broker.subscribe(
+        [events.user_channel(user.id)] + [events.store_channel(sid) for sid in store_ids]
+    )
+
+    def snapshot(ids):
+        return {"summary": dashboard_summary_for(ids), "breakdown": dashboard_breakdown_for(ids)}
+
+    response = StreamingHttpResponse(events.stream(subscription, store_ids, snapshot), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: pass events through as they come
+    return response
 
 
 @api_view(["GET"])
 def dashboard_breakdown(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
+    user = request.user
+    if not user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
+    store_ids = list((user.stores or {}).values())
+    return Response(dashboard_breakdown_for(store_ids), status=status.HTTP_200_OK)
 
-    user = User.objects(id=payload.get("sub")).first()
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(["GET"])
+def dashboard_timeseries(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
     store_ids = list((user.stores or {}).values())
-    breakdown = []
-    for sid in store_ids:
-        try:
-            sdoc = Store.objects(id=sid).first()
-            if not sdoc:
-                continue
-            prods = Product.objects(store=sdoc)
-            products_count = prods.count()
-            orders_count = 0
-            for p in prods:
-                try:
-                    orders_count += int(p.orders_count or 0)
-                except Exception:
-                    continue
-            breakdown.append({
-                "id": str(sdoc.id),
-                "name": sdoc.name,
-                "slug": sdoc.slug,
-                "products": products_count,
-                "orders": orders_count,
-            })
-        except Exception:
-            continue
+    store_id = request.query_params.get("store")
+    if store_id:
+        if store_id not in store_ids:
+            return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+        store_ids = [store_id]
 
-    return Response(breakdown, status=status.HTTP_200_OK)
+    granularity = request.query_params.get("granularity") or "day"
+    try:
+        start = request.query_params.get("from")
+        end = request.query_params.get("to")
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+        series = timeseries(store_ids, granularity=granularity, start=start, end=end)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(series, status=status.HTTP_200_OK)
 
 
 @api_view(["PATCH", "PUT"])
 def update_me(request):
-    token = request.COOKIES.get("access_token")
-    if not token:
+    user = request.user
+    if not user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-
-    user = User.objects(id=payload.get("sub")).first()
-    if not user:
-        return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-
     data = request.data or {}
     for field in ("name", "first_name", "last_name", "phone", "plan"):
         if field in data:
             setattr(user, field, data.get(field) or None)
     user.save()
+    invalidate_user(user.id)
 
     # Return same shape as /auth/me for consistency
-    name = user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
-    stores_slugs = {}
-    try:
-        for sname, sid in (user.stores or {}).items():
-            sdoc = Store.objects(id=sid).first()
-            if sdoc:
-                stores_slugs[sname] = sdoc.slug
-    except Exception:
-        stores_slugs = {}
-    return Response({
-        "id": str(user.id),
-        "email": user.email,
-        "role": user.role or "client",
-        "name": name,
-        "plan": user.plan or "none",
-        "stores": user.stores or {},
-        "stores_slugs": stores_slugs,
-    }, status=status.HTTP_200_OK)
+    payload = _me_payload(user)
+    # Store pages embed the owner's name/phone
+    for store_slug in payload["stores_slugs"].values():
+        storefront_cache.invalidate_store(store_slug)
+    return Response(payload, status=status.HTTP_200_OK)
 
 
 @api_view(["PATCH", "PUT"])
 def update_store(request, sid: str):
-    token = request.COOKIES.get("access_token")
-    if not token:
+    if not request.user.is_authenticated:
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-    secret = getattr(settings, "JWT_SECRET", None) or settings.SECRET_KEY
-    try:
-        payload = pyjwt.decode(token, secret, algorithms=["HS256"])
-    except Exception as e:
-        return Response({"detail": f"Invalid token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
 
     store = Store.objects(id=sid).first()
     if not store:
         return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
-    if not store.owner or str(store.owner.id) != payload.get("sub"):
+    if not store.owner or str(store.owner.id) != str(request.user.id):
         return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
     data = request.data or {}
@@ -629,25 +802,21 @@ def update_store(request, sid: str):
         if field in data:
             setattr(store, field, data.get(field))
 
+    logo_path = None
     try:
         logo_file = request.FILES.get("logo")
     except Exception:
         logo_file = None
     if logo_file:
-        logos_dir = os.path.join(settings.MEDIA_ROOT, "logos")
-        os.makedirs(logos_dir, exist_ok=True)
-        _, ext = os.path.splitext(logo_file.name)
-        filename = f"{store.slug}{ext or ''}"
-        storage = FileSystemStorage(location=logos_dir, base_url=settings.MEDIA_URL + "logos/")
-        saved_name = storage.save(filename, logo_file)
-        try:
-            store.logo_url = request.build_absolute_uri(storage.url(saved_name))
-        except Exception:
-            store.logo_url = storage.url(saved_name)
+        [(logo_path, store.logo_url)] = _save_uploads(request, [logo_file], "logos")
+        store.logo_variants = {}
     alt = data.get("logo_alt")
     if alt is not None:
         store.logo_alt = alt or None
 
     store.save()
+    storefront_cache.invalidate_store(store.slug)
+    if logo_path:
+        image_pipeline.store_logo(store.id, store.slug, logo_path, store.logo_url)
     data = StoreSerializer(store).data
     return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,7 @@
+import os
+
+import django
+
+# pytest without pytest-django: configure Django before the test modules import it
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shopper.test_settings")
+django.setup()
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from corsheaders.defaults import default_headers as default_cors_headers
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,7 +24,14 @@ INSTALLED_APPS = [
     "api",
 ]
 
+# Per-request MongoDB command counts/timings, Server-Timing header and the
+# /api/metrics Prometheus endpoint (api/instrumentation.py)
+DB_INSTRUMENTATION = os.getenv("DB_INSTRUMENTATION", "True").lower() in ("1", "true", "yes")
+DB_SLOW_COMMAND_MS = float(os.getenv("DB_SLOW_COMMAND_MS", "100"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # when set, /api/metrics requires "Authorization: Bearer <token>"
+
 MIDDLEWARE = [
+    *(["api.instrumentation.DBInstrumentationMiddleware"] if DB_INSTRUMENTATION else []),
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -63,6 +71,24 @@ DATABASES = {
 
 AUTH_PASSWORD_VALIDATORS = []
 
+# Password hashing (api/passwords.py). Changing PASSWORD_HASH_ITERATIONS
+# upgrades each stored hash on the user's next successful login.
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "1000000"))
+PASSWORD_HASHERS = [
+    "api.passwords.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+# Processes running PBKDF2 (0 = on the request thread), extra jobs allowed
+# to wait for one (beyond that login/register answer 503), and how long a
+# request waits for its result.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", "16"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -74,28 +100,169 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Resized thumb/medium/large copies of uploads, generated in the background
+# (api/images.py, requires Pillow)
+IMAGE_VARIANTS_ENABLED = os.getenv("IMAGE_VARIANTS_ENABLED", "True").lower() in ("1", "true", "yes")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # DRF basic config
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": [],  # API-only; auth handled by Next/Better Auth
+    # Decodes the access_token cookie once per request and sets request.user
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "api.authentication.CookieJWTAuthentication",
+    ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny"
     ],
 }
 
+# Serialize hot list responses (viewset lists, products/by-slug,
+# stores/directory) from raw documents instead of DocumentSerializers,
+# see api/fast_serializers.py. Check with manage.py bench_serializers.
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "False").lower() in ("1", "true", "yes")
+
+# products/by-slug pagination (?limit=, capped at the max)
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", "50"))
+PRODUCTS_PAGE_SIZE_MAX = int(os.getenv("PRODUCTS_PAGE_SIZE_MAX", "200"))
+
+# stores/directory page size and popularity score, see api/popularity.py
+STORES_PAGE_SIZE = int(os.getenv("STORES_PAGE_SIZE", "24"))
+STORES_PAGE_SIZE_MAX = int(os.getenv("STORES_PAGE_SIZE_MAX", "100"))
+POPULARITY_RECENT_WEIGHT = float(os.getenv("POPULARITY_RECENT_WEIGHT", "2.0"))
+POPULARITY_WINDOW_DAYS = int(os.getenv("POPULARITY_WINDOW_DAYS", "7"))
+
+# products/search page size (?limit=) and deepest result reachable with ?page=
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_PAGE_SIZE_MAX = int(os.getenv("SEARCH_PAGE_SIZE_MAX", "100"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+
+# Django cache framework. "storefront" holds the public store/product
+# responses (api.response_cache); local memory is per process, point it at a
+# shared backend (e.g. Redis/Memcached) to share entries and invalidations.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "storefront": {
+        "BACKEND": os.getenv("STOREFRONT_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("STOREFRONT_CACHE_LOCATION", "storefront"),
+        "TIMEOUT": int(os.getenv("STOREFRONT_CACHE_TIMEOUT", "300")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("STOREFRONT_CACHE_MAX_ENTRIES", "10000"))},
+    },
+}
+STOREFRONT_CACHE_ALIAS = "storefront"
+
+# Rows per insert_many batch in products/import
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "1000"))
+
+# Documents fetched per cursor round trip by the stores/<id>/export/* endpoints
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Caches used by api.authentication (entries per process, TTL in seconds).
+# A cached user may lag edits made through another worker by up to the TTL.
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+
+# Idempotency-Key replays (api/idempotency.py): records live in Mongo for
+# IDEMPOTENCY_TTL seconds (TTL index, fixed when the index is first built),
+# finished ones are also cached per process.
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 60 * 60)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", "300"))
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = os.getenv("CORS_ALLOW_ALL_ORIGINS", "False").lower() in ("1", "true", "yes")
 CORS_ALLOWED_ORIGINS = [o for o in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:3000").split(",") if o]
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "ETag", "Server-Timing", "Idempotent-Replayed"]
+CORS_ALLOW_HEADERS = (*default_cors_headers, "idempotency-key")
 
 # MongoDB (MongoEngine)
 DJANGO_MONGODB_URI = os.getenv("DJANGO_MONGODB_URI", os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
 DJANGO_MONGODB_DB = os.getenv("DJANGO_MONGODB_DB", os.getenv("MONGODB_DB", "shopper"))
 
+
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _write_concern(value):
+    if not value:
+        return None
+    return int(value) if value.isdigit() else value  # e.g. 1 or "majority"
+
+
+# pymongo client options shared by every connection (see api/db.py). Pool
+# size is per process: workers x MONGODB_MAX_POOL_SIZE must stay below the
+# server's connection limit. Unset options keep the driver defaults.
+MONGODB_CLIENT_OPTIONS = {k: v for k, v in {
+    "maxPoolSize": _env_int("MONGODB_MAX_POOL_SIZE", 100),
+    "minPoolSize": _env_int("MONGODB_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": _env_int("MONGODB_MAX_IDLE_TIME_MS"),
+    "waitQueueTimeoutMS": _env_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS"),
+    "serverSelectionTimeoutMS": _env_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 30000),
+    "connectTimeoutMS": _env_int("MONGODB_CONNECT_TIMEOUT_MS", 20000),
+    "socketTimeoutMS": _env_int("MONGODB_SOCKET_TIMEOUT_MS"),
+    "compressors": os.getenv("MONGODB_COMPRESSORS") or None,  # e.g. "zstd,snappy,zlib"
+    "w": _write_concern(os.getenv("MONGODB_WRITE_CONCERN")),
+    "journal": os.getenv("MONGODB_JOURNAL", "").lower() in ("1", "true", "yes") or None,
+    "appname": os.getenv("MONGODB_APPNAME", "shopper"),
+}.items() if v is not None}
+# Read preference of the default connection, and of the alias serving the
+# public storefront reads (stores/products by slug, directory, search,
+# viewset lists). "secondaryPreferred" moves those to secondaries.
+MONGODB_READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+MONGODB_READ_ALIAS = "read"
+MONGODB_READ_URI = os.getenv("MONGODB_READ_URI", DJANGO_MONGODB_URI)
+MONGODB_PUBLIC_READ_PREFERENCE = os.getenv("MONGODB_PUBLIC_READ_PREFERENCE", MONGODB_READ_PREFERENCE)
+
 try:
     from mongoengine import connect
-    connect(host=DJANGO_MONGODB_URI, db=DJANGO_MONGODB_DB)
+    from pymongo import monitoring
+    from api.db import pool_stats, read_preference
+    # Listeners only apply to clients created after registration
+    monitoring.register(pool_stats)
+    if DB_INSTRUMENTATION:
+        from api.instrumentation import db_listener
+        monitoring.register(db_listener)
+    connect(host=DJANGO_MONGODB_URI, db=DJANGO_MONGODB_DB,
+            read_preference=read_preference(MONGODB_READ_PREFERENCE), **MONGODB_CLIENT_OPTIONS)
+    connect(alias=MONGODB_READ_ALIAS, host=MONGODB_READ_URI, db=DJANGO_MONGODB_DB,
+            read_preference=read_preference(MONGODB_PUBLIC_READ_PREFERENCE), **MONGODB_CLIENT_OPTIONS)
 except Exception as e:
     # In dev we don't crash settings; API endpoints will raise on use if not connected
     print("[MongoEngine] Connection setup error:", e)
+
+# Order persistence for buy_product: "sync" writes each Order immediately,
+# "buffered" queues them in-process and flushes with insert_many (faster,
+# but orders still in the buffer are lost if the process dies).
+ORDER_WRITE_MODE = os.getenv("ORDER_WRITE_MODE", "sync").lower()
+ORDER_BUFFER_MAX_SIZE = int(os.getenv("ORDER_BUFFER_MAX_SIZE", "500"))
+ORDER_BUFFER_FLUSH_INTERVAL = float(os.getenv("ORDER_BUFFER_FLUSH_INTERVAL", "1.0"))
+
+# orders/checkout: distinct products and units per product accepted in one cart
+CHECKOUT_MAX_ITEMS = int(os.getenv("CHECKOUT_MAX_ITEMS", "100"))
+CHECKOUT_MAX_QUANTITY = int(os.getenv("CHECKOUT_MAX_QUANTITY", "1000"))
+
+# Sharded orders_count (api/counters.py): purchases of unlimited products
+# increment one of N shard documents instead of the product; 0 turns it off.
+# Shards are folded into the products every FOLD_INTERVAL seconds (0: only
+# through manage.py fold_counters).
+PRODUCT_COUNTER_SHARDS = int(os.getenv("PRODUCT_COUNTER_SHARDS", "0"))
+PRODUCT_COUNTER_FOLD_INTERVAL = float(os.getenv("PRODUCT_COUNTER_FOLD_INTERVAL", "5"))
+
+# Live dashboard deltas (api/events.py, GET /api/dashboard/stream).
+# api.events.LocalBroker delivers within one process; with several workers use
+# api.events.MongoBroker (capped EVENTS_COLLECTION, tailed by each process).
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "api.events.LocalBroker")
+EVENTS_SUBSCRIBER_QUEUE = int(os.getenv("EVENTS_SUBSCRIBER_QUEUE", "100"))
+EVENTS_COLLECTION = os.getenv("EVENTS_COLLECTION", "dashboard_events")
+EVENTS_COLLECTION_SIZE = int(os.getenv("EVENTS_COLLECTION_SIZE", str(16 * 1024 * 1024)))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+SSE_MAX_DURATION = float(os.getenv("SSE_MAX_DURATION", "300"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
@@ -0,0 +1,34 @@
+"""Settings for the test suite (``python -m pytest`` or ``manage.py test --settings=shopper.test_settings``).
+
+MongoEngine points at a scratch database: on TEST_MONGODB_URI when it is
+set, else in mongomock (see api/scratch_db.py). mongomock clients do not
+share data, so there the read alias stays unconnected and storefront reads
+fall back to the default connection (api.db.read_alias).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DB_INSTRUMENTATION, MONGODB_READ_ALIAS
+
+from mongoengine import disconnect
+
+from api.scratch_db import command_listeners, connect_scratch
+
+TEST_MONGODB_URI = os.getenv("TEST_MONGODB_URI", "")  # noqa: F405
+DJANGO_MONGODB_DB = os.getenv("TEST_MONGODB_DB", "shopper_test")  # noqa: F405
+
+connect_scratch("default", DJANGO_MONGODB_DB, host=TEST_MONGODB_URI)
+if TEST_MONGODB_URI:
+    connect_scratch(MONGODB_READ_ALIAS, DJANGO_MONGODB_DB, host=TEST_MONGODB_URI)
+else:
+    disconnect(MONGODB_READ_ALIAS)
+    if DB_INSTRUMENTATION:
+        from api.instrumentation import db_listener
+        command_listeners.append(db_listener)
+
+# Cheap hashing on the request thread, no background image work
+PASSWORD_HASH_ITERATIONS = 1000
+PASSWORD_WORKERS = 0
+IMAGE_VARIANTS_ENABLED = False
+ORDER_WRITE_MODE = "sync"
+PRODUCT_COUNTER_SHARDS = 0
+PRODUCT_COUNTER_FOLD_INTERVAL = 0
+EVENTS_BROKER = "api.events.LocalBroker"
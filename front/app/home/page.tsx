@@ -15,20 +15,48 @@ import { useUser } from "@/components/user-context"
 export default function DashboardPage() {
   const { user, refresh } = useUser()
   const [summary, setSummary] = useState<{ totalStores: number; totalProducts: number; totalOrders: number; totalRevenue: number } | null>(null)
-  const [breakdown, setBreakdown] = useState<Array<{ name: string; slug: string; products: number; orders: number }>>([])
+  const [breakdown, setBreakdown] = useState<Array<{ id: string; name: string; slug: string; products: number; orders: number }>>([])
   const [accountOpen, setAccountOpen] = useState(false)
   const [profileDraft, setProfileDraft] = useState<{ name?: string; first_name?: string; last_name?: string; phone?: string; plan?: string }>({})
   useEffect(() => {
+    const base = process.env.NEXT_PUBLIC_BACKEND_URL ?? "http://localhost:4000"
     async function load() {
       try {
-        const base = process.env.NEXT_PUBLIC_BACKEND_URL ?? "http://localhost:4000"
         const res = await fetch(`${base}/api/dashboard/summary`, { credentials: "include" })
         if (res.ok) setSummary(await res.json())
         const br = await fetch(`${base}/api/dashboard/breakdown`, { credentials: "include" })
         if (br.ok) setBreakdown(await br.json())
       } catch {}
     }
-    load()
+    if (typeof EventSource === "undefined") {
+      load()
+      return
+    }
+    // One snapshot, then per-store deltas pushed by the backend (reconnects by itself)
+    const events = new EventSource(`${base}/api/dashboard/stream`, { withCredentials: true })
+    events.addEventListener("snapshot", (e) => {
+      const data = JSON.parse((e as MessageEvent).data)
+      setSummary(data.summary)
+      setBreakdown(data.breakdown)
+    })
+    events.addEventListener("delta", (e) => {
+      const d = JSON.parse((e as MessageEvent).data)
+      setSummary((s) => s && {
+        ...s,
+        totalOrders: s.totalOrders + (d.orders ?? 0),
+        totalRevenue: s.totalRevenue + (d.revenue ?? 0),
+        totalProducts: s.totalProducts + (d.products ?? 0),
+      })
+      setBreakdown((rows) => rows.map((row) => row.id === d.store
+        ? { ...row, orders: row.orders + (d.orders ?? 0), products: row.products + (d.products ?? 0) }
+        : row))
+    })
+    events.addEventListener("store", (e) => {
+      const store = JSON.parse((e as MessageEvent).data)
+      setSummary((s) => s && { ...s, totalStores: s.totalStores + 1 })
+      setBreakdown((rows) => [...rows, { id: store.id, name: store.name, slug: store.slug, products: 0, orders: 0 }])
+    })
+    return () => events.close()
   }, [])
 
 
@@ -62,14 +62,29 @@ type ProductData = {
   orders_count?: number
 }
 
-async function fetchProductsBySlug(slug: string): Promise<ProductData[]> {
+// One page of products, newest first; `next` is the cursor of the following page
+async function fetchProductsBySlug(slug: string, cursor?: string | null): Promise<{ products: ProductData[]; next: string | null }> {
   try {
     const base = process.env.NEXT_PUBLIC_BACKEND_URL ?? "http://localhost:4000"
-    const res = await fetch(`${base}/api/products/by-slug/${encodeURIComponent(slug)}`)
-    if (!res.ok) return []
-    return await res.json()
+    const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""
+    const res = await fetch(`${base}/api/products/by-slug/${encodeURIComponent(slug)}${qs}`)
+    if (!res.ok) return { products: [], next: null }
+    return { products: await res.json(), next: res.headers.get("X-Next-Cursor") }
   } catch {
-    return []
+    return { products: [], next: null }
+  }
+}
+
+function toProduct(p: ProductData): Product {
+  return {
+    id: p.id,
+    name: p.name,
+    images: p.images || [],
+    description: p.description || "",
+    currentPrice: Number(p.current_price || 0),
+    oldPrice: p.old_price ? Number(p.old_price) : undefined,
+    freeDelivery: false,
+    ordersCount: p.orders_count || 0,
   }
 }
 
@@ -78,6 +93,8 @@ export default function StorePublicPage({ params }: { params: Promise<{ slug: st
   const { user } = useUser()
   const [store, setStore] = useState<StoreData | null>(null)
   const [products, setProducts] = useState<Product[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [editingStore, setEditingStore] = useState(false)
   const [storeName, setStoreName] = useState("")
   const [storeQuote, setStoreQuote] = useState("")
@@ -95,6 +112,22 @@ export default function StorePublicPage({ params }: { params: Promise<{ slug: st
   const [selectedProduct, setSelectedProduct] = useState<Product | null>(null)
   const [isBuying, setIsBuying] = useState(false)
 
+  // Back to the first page (after a write, the pages already shown may have shifted)
+  async function reloadProducts() {
+    const page = await fetchProductsBySlug(slug)
+    setProducts(page.products.map(toProduct))
+    setNextCursor(page.next)
+  }
+
+  async function loadMoreProducts() {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    const page = await fetchProductsBySlug(slug, nextCursor)
+    setProducts((prev) => [...prev, ...page.products.map(toProduct)])
+    setNextCursor(page.next)
+    setLoadingMore(false)
+  }
+
   useEffect(() => {
     async function loadData() {
       const storeData = await fetchStoreBySlug(slug)
@@ -104,19 +137,9 @@ export default function StorePublicPage({ params }: { params: Promise<{ slug: st
         setStoreQuote(storeData.quote || "")
         setStoreDesc(storeData.description || "")
         setStoreLogoAlt(storeData.logo_alt || "")
-        const prods = await fetchProductsBySlug(slug)
-        setProducts(
-          prods.map((p) => ({
-            id: p.id,
-            name: p.name,
-            images: p.images || [],
-            description: p.description || "",
-            currentPrice: Number(p.current_price || 0),
-            oldPrice: p.old_price ? Number(p.old_price) : undefined,
-            freeDelivery: false,
-            ordersCount: p.orders_count || 0,
-          }))
-        )
+        const page = await fetchProductsBySlug(slug)
+        setProducts(page.products.map(toProduct))
+        setNextCursor(page.next)
       }
       setLoading(false)
     }
@@ -202,18 +225,7 @@ export default function StorePublicPage({ params }: { params: Promise<{ slug: st
     if (res.ok) {
       setShowProductModal(false)
       setEditingProduct(null)
-      const prods = await fetchProductsBySlug(slug)
-      setProducts(
-        prods.map((p) => ({
-          id: p.id,
-          name: p.name,
-          images: p.images || [],
-          description: p.description || "",
-          currentPrice: Number(p.current_price || 0),
-          oldPrice: p.old_price ? Number(p.old_price) : undefined,
-          freeDelivery: false,
-        }))
-      )
+      await reloadProducts()
     } else {
       alert("Failed to save product")
     }
@@ -224,18 +236,7 @@ export default function StorePublicPage({ params }: { params: Promise<{ slug: st
     const res = await fetch(`${base}/api/products/buy/${pid}`, { method: "POST" })
     if (res.ok) {
       alert("Thank you for purchasing this item")
-      const prods = await fetchProductsBySlug(slug)
-      setProducts(
-        prods.map((p) => ({
-          id: p.id,
-          name: p.name,
-          images: p.images || [],
-          description: p.description || "",
-          currentPrice: Number(p.current_price || 0),
-          oldPrice: p.old_price ? Number(p.old_price) : undefined,
-          freeDelivery: false,
-        }))
-      )
+      await reloadProducts()
     } else {
       alert("Failed to process order")
     }
@@ -355,6 +356,14 @@ export default function StorePublicPage({ params }: { params: Promise<{ slug: st
             </Card>
           )}
         </div>
+        {nextCursor && (
+          <div className="mt-8 flex justify-center">
+            <Button variant="secondary" onClick={loadMoreProducts} disabled={loadingMore}>
+              {loadingMore && <Loader2 className="mr-2 size-4 animate-spin" />}
+              Load more
+            </Button>
+          </div>
+        )}
       </main>
 
       {/* Product Detail Modal */}